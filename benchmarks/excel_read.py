@@ -0,0 +1,90 @@
+"""
+Compares parse time and peak memory of the Excel ingestion paths.
+
+Usage:
+    python benchmarks/excel_read.py [--rows 100000] [--extra-columns 15]
+
+Generates a vendor-style .xlsx export with the pipeline's input columns plus unused
+extra columns, then reads it in a fresh process per method:
+
+- baseline: `pd.read_excel` on the default openpyxl engine (the previous upload path)
+- calamine: `users.readers` streaming the sheet with python-calamine
+- openpyxl-stream: `users.readers` streaming the sheet with openpyxl in read-only mode
+"""
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+METHODS = ("baseline", "calamine", "openpyxl-stream")
+
+
+def generate(path, rows, extra_columns):
+    import xlsxwriter
+
+    from users.tiering import INPUT_COLUMNS
+
+    columns = INPUT_COLUMNS + [f"Vendor Field {i}" for i in range(extra_columns)]
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    worksheet = workbook.add_worksheet("Companies")
+    worksheet.write_row(0, 0, columns)
+    for row in range(1, rows + 1):
+        values = []
+        for col in columns:
+            if col in ("Founding Year", "Employee Count", "Total Raised"):
+                values.append(row % 5000)
+            elif col == "Date of Most Recent Investment":
+                values.append(f"20{10 + row % 14}-01-01")
+            else:
+                values.append(f"{col} {row}")
+        worksheet.write_row(row, 0, values)
+    workbook.close()
+    return len(columns)
+
+
+def run_method(method, path):
+    import pandas as pd
+
+    from users import readers
+
+    data = Path(path).read_bytes()
+    start = time.perf_counter()
+    if method == "baseline":
+        rows = len(pd.read_excel(path))
+    elif method == "calamine":
+        rows = sum(len(chunk) for chunk in readers._read_excel_calamine(data, 0, readers.CHUNK_ROWS))
+    else:
+        rows = sum(len(chunk) for chunk in readers._read_excel_openpyxl(data, 0, readers.CHUNK_ROWS))
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{method:16} {rows:>8} rows  {elapsed:8.2f} s  {peak_mb:8.1f} MB peak RSS")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--extra-columns", type=int, default=15)
+    parser.add_argument("--method", choices=METHODS, help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.method:
+        run_method(args.method, args.file)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "upload.xlsx")
+        columns = generate(path, args.rows, args.extra_columns)
+        print(f"{args.rows} rows x {columns} columns, {Path(path).stat().st_size / 2**20:.1f} MB")
+        for method in METHODS:
+            subprocess.run([sys.executable, __file__, "--method", method, "--file", path], cwd=BASE_DIR)
+
+
+if __name__ == "__main__":
+    main()
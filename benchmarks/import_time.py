@@ -0,0 +1,82 @@
+"""
+Measures import time of the web and worker entry points with `python -X importtime`.
+
+Usage:
+    python benchmarks/import_time.py [--top 15]
+
+For each entry point this prints the total import time, whether pandas/numpy/openai
+were loaded, and the slowest top-level imports by cumulative time.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+ENTRY_POINTS = {
+    # What a web worker loads to serve requests: the WSGI app and the URLconf chain.
+    "web": (
+        "from dealflow_automator.wsgi import application; "
+        "from django.urls import get_resolver; get_resolver().url_patterns"
+    ),
+    # What a Celery worker loads to run process_uploaded_file.
+    "worker": (
+        "import django; django.setup(); "
+        "import users.tasks, users.tiering, users.llm_helpers; users.llm_helpers.get_client()"
+    ),
+}
+
+HEAVY_MODULES = ("pandas", "numpy", "openai")
+
+LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure(code):
+    """
+    Runs `code` in a fresh interpreter with -X importtime and parses the report.
+
+    Returns:
+        list[tuple[int, int, int, str]]: (self_us, cumulative_us, depth, module) per import.
+    """
+    env = dict(os.environ)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "dealflow_automator.settings")
+    env.setdefault("OPENAI_API_KEY", "sk-import-time-benchmark")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.splitlines()[-1] if proc.stderr else "import failed")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, module))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest top-level imports to show")
+    args = parser.parse_args()
+
+    for name, code in ENTRY_POINTS.items():
+        rows = measure(code)
+        modules = {module for _, _, _, module in rows}
+        total_ms = sum(self_us for self_us, _, _, _ in rows) / 1000
+        loaded = [mod for mod in HEAVY_MODULES if mod in modules]
+
+        print(f"== {name}: {total_ms:.1f} ms total, {len(rows)} modules")
+        print(f"   heavy modules loaded: {', '.join(loaded) or 'none'}")
+        top_level = sorted((row for row in rows if row[2] == 0), key=lambda row: row[1], reverse=True)
+        for _, cumulative_us, _, module in top_level[:args.top]:
+            print(f"   {cumulative_us / 1000:8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
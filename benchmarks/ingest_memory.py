@@ -0,0 +1,312 @@
+"""
+Compares peak memory of `process_uploaded_file` from ingestion to the output frames.
+
+Usage:
+    python benchmarks/ingest_memory.py [--rows 100000] [--extra-columns 15] [--format csv]
+                                       [--budget 150]
+
+Generates a vendor-style export with the pipeline's input columns plus unused extra
+columns, then runs each method in a fresh process, with stubbed LLM helpers, up to the
+point where the Excel files would be written:
+
+- baseline: whole-file `pd.read_csv` / `pd.read_excel`, row-wise tier functions, a copied
+  enrichment frame merged back, and copied output frames (the previous task code)
+- current: the task's path: `read_tiered_companies`, the enrichment slice,
+  `generate_descriptions_and_tiers_with_progress`, `assign_enrichment` and
+  `build_output_frames` (the enrichment cache is disabled, as it lives out of process)
+
+Reports time and peak RSS growth over the process's footprint after imports, in total
+and per 100k rows. Exits non-zero if the current path exceeds `--budget` MB per 100k
+rows; the budget is calibrated for the default file shape, as fixed overheads dominate
+small files.
+"""
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+METHODS = ("baseline", "current")
+
+# Peak RSS growth allowed for the current path, in MB per 100k rows.
+BUDGET_MB = 150
+
+CONFIG = {
+    "country": {"USA": 1, "Canada": 2, "UK": 3, "Germany": None},
+    "Ownership": {"Private": 1, "Public": 4, "Private Equity": 2},
+    "FTE_Count": {
+        "tier_1": {"Private": {"min": 10, "max": 100}},
+        "tier_2": {"Private": {"min": 5, "max": 500}, "Public": {"min": 0, "max": 50}},
+        "tier_3": {},
+    },
+    "founding_year": {"tier_1": "2000", "tier_2": "2010", "tier_3": "2015"},
+    "fundraiser_year": {"tier_1": "2015", "tier_2": "2020", "tier_3": "2022"},
+    "total_raised": {
+        "tier_1": {"Private Equity": 1000000, "Others": 500000},
+        "tier_2": {"Others": 5000000},
+        "tier_3": {},
+    },
+}
+
+
+def generate(path, rows, extra_columns, file_format):
+    import pandas as pd
+
+    from users.tiering import INPUT_COLUMNS
+
+    countries = ["USA", "Canada", "UK", "Germany", "France", None]
+    ownerships = ["Private", "Public", "Private Equity", "Seed", None]
+    data = {}
+    for col in INPUT_COLUMNS + [f"Vendor Field {i}" for i in range(extra_columns)]:
+        if col == "Country":
+            data[col] = [countries[row % 6] for row in range(rows)]
+        elif col == "Ownership":
+            data[col] = [ownerships[row % 5] for row in range(rows)]
+        elif col == "Founding Year":
+            data[col] = [1980 + row % 45 for row in range(rows)]
+        elif col in ("Employee Count", "Total Raised"):
+            data[col] = [(row * 37) % 5000 * (1000 if col == "Total Raised" else 1) for row in range(rows)]
+        elif col == "Date of Most Recent Investment":
+            data[col] = [f"20{10 + row % 14}-01-01" for row in range(rows)]
+        else:
+            data[col] = [f"{col} {row}" for row in range(rows)]
+    df = pd.DataFrame(data)
+    if file_format == "csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+    return len(df.columns)
+
+
+def baseline(file_data, filename, config):
+    import io
+
+    import pandas as pd
+
+    if filename.endswith(".csv"):
+        try:
+            df = pd.read_csv(io.BytesIO(file_data), encoding="utf-8")
+        except Exception:
+            df = pd.read_csv(io.BytesIO(file_data), encoding="latin1")
+    else:
+        df = pd.read_excel(io.BytesIO(file_data))
+
+    df = df[df["Company Name"].notna()].reset_index(drop=True)
+    df["Founding Year"] = pd.to_numeric(df.get("Founding Year"), errors="coerce")
+    df["Total Raised"] = pd.to_numeric(df.get("Total Raised"), errors="coerce")
+    df["Employee Count"] = pd.to_numeric(df.get("Employee Count"), errors="coerce")
+    df["Index"] = df.index + 1
+
+    def get_founding_tier(year):
+        if pd.isna(year): return None
+        year = int(year)
+        for tier, max_year in config["founding_year"].items():
+            if year <= int(max_year):
+                return int(tier[-1])
+        return 4
+
+    def get_fundraise_tier(date_str):
+        if pd.isna(date_str): return 3
+        try:
+            year = pd.to_datetime(date_str).year
+            for tier, val in config["fundraiser_year"].items():
+                if year <= int(val): return int(tier[-1])
+        except Exception:
+            pass
+        return 3
+
+    def get_total_raised_tier(row):
+        raised = row["Total Raised"]
+        owner = row["Ownership"]
+        if pd.isna(raised) or pd.isna(owner): return None
+        owner_group = owner if owner in config["total_raised"]["tier_1"] else "Others"
+        for tier in ["tier_1", "tier_1_extra", "tier_2", "tier_3"]:
+            limit = config["total_raised"].get(tier, {}).get(owner_group)
+            if limit is not None:
+                try:
+                    if float(raised) <= float(limit):
+                        return int(tier[-1])
+                except Exception:
+                    continue
+        return 4
+
+    def get_fte_tier(row):
+        fte = row["Employee Count"]
+        ownership = row["Ownership"]
+        if pd.isna(fte) or pd.isna(ownership): return None
+        try:
+            fte = int(fte)
+            for tier, rule in config["FTE_Count"].items():
+                limits = rule.get(ownership)
+                if limits and limits.get("min") <= fte <= limits.get("max"):
+                    return int(tier[-1])
+        except Exception:
+            return None
+        return 4
+
+    df["country_tier"] = df["Country"].map(config.get("country", {}))
+    df["ownership_tier"] = df["Ownership"].map(config.get("Ownership", {}))
+    df["founding_tier"] = df["Founding Year"].apply(get_founding_tier)
+    df["fundraise_tier"] = df["Date of Most Recent Investment"].apply(get_fundraise_tier)
+    df["raised_tier"] = df.apply(get_total_raised_tier, axis=1)
+    df["fte_tier"] = df.apply(get_fte_tier, axis=1)
+    df["Pre-Product Tier"] = df[[
+        "country_tier", "ownership_tier", "founding_tier",
+        "fundraise_tier", "raised_tier", "fte_tier"
+    ]].max(axis=1)
+
+    df_gpt = df[df["Pre-Product Tier"] != 4].copy()
+
+    product_tiers, descriptions = [], []
+    for _, row in df_gpt.iterrows():
+        product_tiers.append(stub_product_tier(row.get("Description", ""), row.get("Website", ""))[0])
+        descriptions.append(stub_description(row.get("Description", ""), row.get("Website", ""))[0])
+
+    df_gpt["Product Tier - CHAT GPT"] = pd.Series(product_tiers).apply(pd.to_numeric, errors="coerce").fillna(0)
+    df_gpt["2 Word Description"] = descriptions
+    df = df.merge(
+        df_gpt[["Index", "Product Tier - CHAT GPT", "2 Word Description"]],
+        on="Index", how="left"
+    )
+
+    df["Product Tier - CHAT GPT"] = df["Product Tier - CHAT GPT"].fillna(0)
+    df["Post Tier"] = df[["Pre-Product Tier", "Product Tier - CHAT GPT"]].max(axis=1)
+    df["Post_Order"] = df["Post Tier"] * 10000 - df["Index"]
+    df["Post Rank"] = df["Post_Order"].rank(method="min", ascending=True).astype(int)
+    df["Tier"] = df["Post Tier"]
+
+    df = df[df["Post Tier"] != 4]
+    df = df.sort_values(by=["Post Tier", "Employee Count"], ascending=[True, False])
+
+    final_columns = [
+        "Post Rank", "Tier", "Company Name", "Informal Name", "Founding Year", "Country",
+        "Website", "Description", "Employee Count", "Ownership", "Total Raised",
+        "Date of Most Recent Investment", "Executive Title", "Executive First Name",
+        "Executive Last Name", "Executive Email", "Investors", "2 Word Description"
+    ]
+    processed_df = df[[col for col in final_columns if col in df.columns]].copy()
+    processed_df.rename(columns={"Employee Count": "Count", "Company Name": "Name"}, inplace=True)
+
+    df["2 Word Description - CHAT GPT"] = df["2 Word Description"]
+    df["Include"] = ""
+    action_columns = [
+        "Pre-Product Tier", "Post Tier", "Post_Order", "Post Rank", "Index",
+        "Include", "Company Name", "Website", "Description", "Employee Count",
+        "Product Tier - CHAT GPT", "2 Word Description - CHAT GPT"
+    ]
+    action_df = df[[col for col in action_columns if col in df.columns]].copy()
+    return processed_df, action_df
+
+
+def current(file_data, filename, config):
+    from users.readers import read_tiered_companies
+    from users.tiering import assign_enrichment, build_output_frames
+    from users.utilities import generate_descriptions_and_tiers_with_progress
+
+    df = read_tiered_companies(file_data, filename, config)
+    for col in ("Country", "Ownership"):
+        df[col] = df[col].astype("category")
+    needs_gpt = df["Pre-Product Tier"].ne(4).fillna(True).astype(bool)
+    df_gpt = df.loc[needs_gpt, [col for col in ("Description", "Website") if col in df.columns]]
+
+    enrichment = generate_descriptions_and_tiers_with_progress(df_gpt, user_id=0)
+    assign_enrichment(df, enrichment, df_gpt.index)
+    del df_gpt, enrichment
+    return build_output_frames(df)
+
+
+def stub_product_tier(description, website, usage=None):
+    return len(str(description)) % 4 + 1, "stub"
+
+
+def stub_description(description, website, usage=None):
+    return "vertical software", "stub"
+
+
+def setup_stubs():
+    """
+    Configures Django with an in-process cache and replaces the LLM helpers with stubs.
+    """
+    from django.conf import settings
+
+    settings.configure(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        LLM_ENRICHMENT_CACHE_TIMEOUT=0,
+    )
+
+    from users import llm_helpers
+
+    llm_helpers.get_product_tier = stub_product_tier
+    llm_helpers.get_two_word_description = stub_description
+
+
+def run_method(method, path, rows, budget_mb):
+    import pandas  # noqa: F401
+
+    setup_stubs()
+
+    import users.readers  # noqa: F401
+    import users.tiering  # noqa: F401
+    import users.utilities  # noqa: F401
+
+    data = Path(path).read_bytes()
+    before_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start = time.perf_counter()
+    processed_df, _ = (baseline if method == "baseline" else current)(data, path, CONFIG)
+    elapsed = time.perf_counter() - start
+    growth_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 - before_mb
+    per_100k = growth_mb / rows * 100000
+    print(
+        f"{method:10} {rows:>8} rows  {len(processed_df):>8} kept  {elapsed:8.2f} s  "
+        f"{growth_mb:8.1f} MB peak RSS growth  {per_100k:8.1f} MB / 100k rows"
+    )
+    if method == "current" and per_100k > budget_mb:
+        print(f"FAIL: {per_100k:.1f} MB / 100k rows exceeds the {budget_mb} MB budget")
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--extra-columns", type=int, default=15)
+    parser.add_argument("--format", choices=("csv", "xlsx"), default="csv")
+    parser.add_argument("--budget", type=float, default=BUDGET_MB, help="Allowed MB per 100k rows (current path)")
+    parser.add_argument("--method", choices=METHODS, help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    parser.add_argument("--generate", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.method:
+        sys.exit(0 if run_method(args.method, args.file, args.rows, args.budget) else 1)
+    if args.generate:
+        columns = generate(args.file, args.rows, args.extra_columns, args.format)
+        print(f"{args.rows} rows x {columns} columns, {Path(args.file).stat().st_size / 2**20:.1f} MB")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / f"upload.{args.format}")
+        # Generated in its own process: peak RSS carries over to child processes
+        subprocess.run(
+            [sys.executable, __file__, "--generate", "--file", path, "--rows", str(args.rows),
+             "--extra-columns", str(args.extra_columns), "--format", args.format],
+            cwd=BASE_DIR, check=True,
+        )
+        returncode = 0
+        for method in METHODS:
+            result = subprocess.run(
+                [sys.executable, __file__, "--method", method, "--file", path, "--rows", str(args.rows),
+                 "--budget", str(args.budget)],
+                cwd=BASE_DIR,
+            )
+            returncode = returncode or result.returncode
+    sys.exit(returncode)
+
+
+if __name__ == "__main__":
+    main()
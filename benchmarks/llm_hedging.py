@@ -0,0 +1,119 @@
+"""
+Measures per-row LLM latency with and without hedged requests against a mock OpenAI server.
+
+Usage:
+    python benchmarks/llm_hedging.py [--rows 1000] [--workers 8] [--stragglers 0.02]
+
+Starts a local HTTP server that mimics `/v1/chat/completions` with log-normal latency
+and a fraction of straggler responses, then runs `get_product_tier` for every row in a
+fresh process per mode (hedging off: LLM_HEDGE_BUDGET=0, hedging on: the configured budget)
+and reports p50/p95/p99/max row latency and the number of extra (hedged) calls.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def make_handler(median, straggler_rate, straggler_delay):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if random.random() < straggler_rate:
+                time.sleep(straggler_delay)
+            else:
+                time.sleep(random.lognormvariate(0, 0.3) * median)
+            payload = json.dumps({
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "2"}}],
+                "usage": {"prompt_tokens": 300, "completion_tokens": 1, "total_tokens": 301},
+            }).encode()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def run_rows(rows, workers):
+    sys.path.insert(0, str(BASE_DIR))
+    from users.llm_helpers import LLMUsage, get_product_tier
+
+    usage = LLMUsage()
+
+    def row(i):
+        start = time.perf_counter()
+        get_product_tier(f"Company {i} sells vertical software", f"https://example{i}.com", usage)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = sorted(executor.map(row, range(rows)))
+
+    stats = next(iter(usage.summary().values()))
+    pct = lambda q: latencies[int(q * (len(latencies) - 1))] * 1000
+    print(
+        f"hedge budget {os.environ['LLM_HEDGE_BUDGET']:>5}: "
+        f"p50 {pct(0.5):7.0f} ms  p95 {pct(0.95):7.0f} ms  p99 {pct(0.99):7.0f} ms  "
+        f"max {latencies[-1] * 1000:7.0f} ms  calls {stats['calls']}  hedges {stats['hedges']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--median", type=float, default=0.2, help="Median response time in seconds")
+    parser.add_argument("--stragglers", type=float, default=0.02, help="Fraction of straggler responses")
+    parser.add_argument("--straggler-delay", type=float, default=5.0, help="Straggler response time in seconds")
+    parser.add_argument("--budget", default=os.getenv("LLM_HEDGE_BUDGET", "0.05"), help="Hedge budget to compare")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_rows(args.rows, args.workers)
+        return
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), make_handler(args.median, args.stragglers, args.straggler_delay)
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-mock",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1",
+        "LLM_STRONG_MODEL": "",
+        "LLM_MAX_RETRIES": "0",
+    })
+    print(f"{args.rows} rows, {args.workers} workers, {args.stragglers:.0%} stragglers at {args.straggler_delay}s")
+    for budget in ("0", args.budget):
+        env["LLM_HEDGE_BUDGET"] = budget
+        subprocess.run(
+            [sys.executable, __file__, "--run", "--rows", str(args.rows), "--workers", str(args.workers)],
+            cwd=BASE_DIR, env=env, check=True,
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Checks how the LLM helpers behave during an OpenAI outage, against a mock server.
+
+Usage:
+    python benchmarks/llm_outage.py [--rows 5] [--timeout 1]
+
+Starts a local HTTP server that mimics `/v1/chat/completions` and fails every request,
+then runs `get_product_tier` and `get_two_word_description` for every row in a fresh
+process per scenario and reports the calls made per model and the time per row.
+Each row is then enriched once more through `enrich_company`, whose answers must not
+be cached:
+
+- errors: every request gets HTTP 500 (retried up to `LLM_MAX_RETRIES` times)
+- auth: every request gets HTTP 401 (never retried)
+- hang: no request is ever answered (each call should give up after `LLM_CALL_TIMEOUT`)
+
+Exits non-zero if a failed request was escalated to the strong model, a call overran
+its deadline, a failed answer was attributed to a model or cached, or a rejected
+request was retried.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+SCENARIOS = ("errors", "auth", "hang")
+
+
+class OutageHandler(BaseHTTPRequestHandler):
+    requests = Counter()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        scenario = self.path.split("/")[1]
+        self.requests[scenario] += 1
+        if scenario == "hang":
+            time.sleep(3600)
+            return
+        if scenario == "auth":
+            status, error = 401, {"message": "mock invalid key", "type": "invalid_request_error"}
+        else:
+            status, error = 500, {"message": "mock outage", "type": "server_error"}
+        payload = json.dumps({"error": error}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_rows(rows, scenario):
+    sys.path.insert(0, str(BASE_DIR))
+    from django.conf import settings
+
+    from dealflow_automator import settings as project_settings
+
+    settings.configure(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        LLM_ENRICHMENT_CACHE_TIMEOUT=3600,
+        LLM_FAST_MODEL=project_settings.LLM_FAST_MODEL,
+        LLM_STRONG_MODEL=project_settings.LLM_STRONG_MODEL,
+    )
+
+    from users.llm_helpers import LLMUsage, get_product_tier, get_two_word_description
+    from users.utilities import enrich_company, get_cached_enrichments, get_enrichment_key
+
+    companies = [(f"Company {i} sells vertical software", f"https://example{i}.com") for i in range(rows)]
+    usage = LLMUsage()
+    answers = []
+    start = time.perf_counter()
+    for description, website in companies:
+        answers.append(get_product_tier(description, website, usage))
+        answers.append(get_two_word_description(description, website, usage))
+    per_row = (time.perf_counter() - start) / rows
+
+    for description, website in companies:
+        enrich_company(description, website)
+    cached = get_cached_enrichments(get_enrichment_key(description, website) for description, website in companies)
+
+    calls = {model: stats["calls"] for model, stats in usage.summary().items()}
+    print(f"{scenario:7} calls per model: {calls}  {per_row * 1000:.0f} ms per row")
+
+    failures = []
+    strong_model = os.environ["LLM_STRONG_MODEL"]
+    if calls.get(strong_model):
+        failures.append(f"failed requests were escalated to {strong_model}")
+    # Two helpers per row, each one call bounded by the deadline (plus scheduling slack)
+    if per_row > 2 * (float(os.environ["LLM_CALL_TIMEOUT"]) + 0.5):
+        failures.append(f"calls overran the {os.environ['LLM_CALL_TIMEOUT']}s deadline")
+    if any(model is not None for _, model in answers):
+        failures.append("failed answers were attributed to a model")
+    if cached:
+        failures.append(f"{len(cached)} failed enrichments were cached")
+    for failure in failures:
+        print("FAIL:", failure)
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=1.0, help="LLM_CALL_TIMEOUT in seconds")
+    parser.add_argument("--run", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        sys.exit(0 if run_rows(args.rows, args.run) else 1)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OutageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-mock",
+        "LLM_FAST_MODEL": env.get("LLM_FAST_MODEL", "gpt-3.5-turbo"),
+        "LLM_STRONG_MODEL": env.get("LLM_STRONG_MODEL") or "gpt-4o",
+        "LLM_CALL_TIMEOUT": str(args.timeout),
+    })
+    print(f"{args.rows} rows, LLM_CALL_TIMEOUT={args.timeout}s")
+    returncode = 0
+    for scenario in SCENARIOS:
+        env["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/{scenario}/v1"
+        result = subprocess.run(
+            [sys.executable, __file__, "--run", scenario, "--rows", str(args.rows)], cwd=BASE_DIR, env=env
+        )
+        returncode = returncode or result.returncode
+    # Both helpers, then enrich_company, once per row: one request each, no retries
+    if OutageHandler.requests["auth"] != 4 * args.rows:
+        print(f"FAIL: {OutageHandler.requests['auth']} requests for {4 * args.rows} rejected calls")
+        returncode = 1
+    server.shutdown()
+    sys.exit(returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -97,6 +97,36 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 20))
+ENRICH_STREAM_WORKERS = int(os.getenv("ENRICH_STREAM_WORKERS", 8))
+
+# Model cascade: every row goes to the fast model, Tier 3 / unparseable answers escalate to the strong one.
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "gpt-3.5-turbo")
+LLM_STRONG_MODEL = os.getenv("LLM_STRONG_MODEL", "gpt-4o")
+
+# Deadline (seconds) for each LLM call, covering all of its attempts, and the retries of
+# transient errors that `_hedged_call` makes within it (SDK retries are disabled).
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", 30))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+
+# Hedged requests: a call slower than this latency quantile gets one duplicate,
+# capped at LLM_HEDGE_BUDGET extra calls per call (0 disables hedging).
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", 0.95))
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", 0.05))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+
+# Seconds LLM answers are cached per company (description + website + prompts + models); 0 disables the cache.
+LLM_ENRICHMENT_CACHE_TIMEOUT = int(os.getenv("LLM_ENRICHMENT_CACHE_TIMEOUT", 60 * 60 * 24 * 30))
+
+# USD per 1M (input, output) tokens, used for cost reporting.
+LLM_MODEL_COSTS = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
 
 REDIS_URL = "redis://127.0.0.1:6379/1"
 
@@ -112,3 +142,5 @@ CACHES = {
 
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
+# Report STARTED for running tasks, so uploads can tell a queued job from one lost with its worker.
+CELERY_TASK_TRACK_STARTED = True
@@ -0,0 +1,92 @@
+from django.conf import settings
+
+from users.utilities import get_cached_enrichments, get_enrichment_key, get_recent_llm_usage
+
+# LLM helpers run per company (product tier and two-word description).
+CALLS_PER_COMPANY = 2
+
+
+def tier_distribution(df):
+    """
+    Counts companies per "Pre-Product Tier".
+
+    Returns:
+        dict: Company count per tier ("1"–"4"), plus "unknown" for rows without a rule tier.
+    """
+    tiers = df["Pre-Product Tier"]
+    distribution = {str(tier): 0 for tier in range(1, 5)}
+    for tier, count in sorted(tiers.value_counts().items()):
+        distribution[str(int(tier))] = int(count)
+    distribution["unknown"] = int(tiers.isna().sum())
+    return distribution
+
+
+def count_enrichment_work(df):
+    """
+    Counts the companies the enrichment step would send to the LLM.
+
+    Rows excluded by the rule tiers (Tier 4) are skipped, rows sharing a description and
+    website are enriched once, and companies already in the enrichment cache need no call.
+
+    Returns:
+        dict: "eligible_rows", "duplicate_rows", "cached_rows" and "rows_to_enrich"
+        (distinct companies that still need LLM calls).
+    """
+    needs_gpt = df["Pre-Product Tier"].ne(4).fillna(True).astype(bool)
+    eligible = df.loc[needs_gpt]
+    descriptions = eligible["Description"] if "Description" in eligible.columns else [""] * len(eligible)
+    websites = eligible["Website"] if "Website" in eligible.columns else [""] * len(eligible)
+    keys = {get_enrichment_key(description, website) for description, website in zip(descriptions, websites)}
+    cached = len(get_cached_enrichments(keys))
+    return {
+        "eligible_rows": len(eligible),
+        "duplicate_rows": len(eligible) - len(keys),
+        "cached_rows": cached,
+        "rows_to_enrich": len(keys) - cached,
+    }
+
+
+def estimate_llm_workload(rows):
+    """
+    Estimates LLM calls, tokens, cost and wall time for enriching `rows` companies.
+
+    Based on the LLM statistics of the most recent jobs (`get_recent_llm_usage()`):
+    escalation rates are the strong model's calls relative to the fast model's, and tokens,
+    cost and latency are the measured averages per call. Wall time assumes the task's
+    sequential calls.
+
+    Returns:
+        dict or None: "calls", "prompt_tokens", "completion_tokens", "cost_usd", "wall_time_s",
+        "per_model" breakdown, "recent_jobs" and "measured_calls" (the sample), or None when
+        no recent job has made LLM calls.
+    """
+    cascade = [model for model in (settings.LLM_FAST_MODEL, settings.LLM_STRONG_MODEL) if model]
+    recent_jobs, totals = get_recent_llm_usage(cascade)
+    first = totals.get(cascade[0]) if cascade else None
+    if not first:
+        return None
+
+    per_model = {}
+    for model in cascade:
+        stats = totals.get(model)
+        if not stats:
+            continue
+        calls = rows * CALLS_PER_COMPANY * stats["calls"] / first["calls"]
+        per_model[model] = {
+            "calls": round(calls),
+            "prompt_tokens": round(calls * stats["prompt_tokens"] / stats["calls"]),
+            "completion_tokens": round(calls * stats["completion_tokens"] / stats["calls"]),
+            "cost_usd": round(calls * stats["cost_usd"] / stats["calls"], 4),
+            "wall_time_s": round(calls * stats["avg_latency_ms"] / 1000, 1),
+        }
+
+    return {
+        "calls": sum(stats["calls"] for stats in per_model.values()),
+        "prompt_tokens": sum(stats["prompt_tokens"] for stats in per_model.values()),
+        "completion_tokens": sum(stats["completion_tokens"] for stats in per_model.values()),
+        "cost_usd": round(sum(stats["cost_usd"] for stats in per_model.values()), 4),
+        "wall_time_s": round(sum(stats["wall_time_s"] for stats in per_model.values()), 1),
+        "per_model": per_model,
+        "recent_jobs": recent_jobs,
+        "measured_calls": sum(stats["calls"] for stats in totals.values()),
+    }
@@ -1,15 +1,306 @@
-import openai
-from openai import OpenAI
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-from dealflow_automator.settings import OPENAI_API_KEY
+from dealflow_automator.settings import (
+    LLM_CALL_TIMEOUT, LLM_FAST_MODEL, LLM_HEDGE_BUDGET, LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_QUANTILE, LLM_MAX_RETRIES,
+    LLM_MODEL_COSTS, LLM_STRONG_MODEL, OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MAX_CONNECTIONS,
+)
 
-openai.api_key = OPENAI_API_KEY
+_client = None
+_client_pid = None
+_executor = None
+_executor_pid = None
 
-client = OpenAI()
+# Models tried in order: every row goes to the fast model, ambiguous/unparseable rows escalate.
+CASCADE_MODELS = list(dict.fromkeys(model for model in (LLM_FAST_MODEL, LLM_STRONG_MODEL) if model))
 
 
-def get_product_tier(description, website):
-    prompt = f"""
+def get_client():
+    """
+    Returns the OpenAI client for the current process, creating it on first use.
+
+    The openai SDK is imported here rather than at module level so that web processes
+    which never call the API do not pay for it. The client keeps a pool of keep-alive
+    connections that is reused by every call in the process; it is rebuilt after a fork
+    so pooled sockets are never shared between Celery worker processes. SDK retries are
+    disabled: `_hedged_call` retries itself so that retries stay within the call deadline.
+
+    Returns:
+        openai.OpenAI: The shared client instance.
+    """
+    global _client, _client_pid
+
+    if _client is None or _client_pid != os.getpid():
+        import httpx
+        from openai import DefaultHttpxClient, OpenAI
+
+        _client = OpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL,
+            max_retries=0,
+            http_client=DefaultHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                ),
+            ),
+        )
+        _client_pid = os.getpid()
+    return _client
+
+
+def _get_executor():
+    """
+    Returns the per-process thread pool that runs LLM call attempts (primary and hedged).
+    """
+    global _executor, _executor_pid
+
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=OPENAI_MAX_CONNECTIONS * 2, thread_name_prefix="llm")
+        _executor_pid = os.getpid()
+    return _executor
+
+
+class _LatencyTracker:
+    """
+    Rolling window of successful call latencies for one model, used to pick the hedge delay.
+    """
+
+    def __init__(self, size=500):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=size)
+
+    def add(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def quantile(self, q):
+        """
+        Returns the q-quantile of recent latencies in seconds, or None until enough calls were seen.
+        """
+        with self._lock:
+            if len(self._latencies) < LLM_HEDGE_MIN_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[int(q * (len(latencies) - 1))]
+
+
+class _HedgeBudget:
+    """
+    Caps hedged duplicates at a fraction of all calls made by the process.
+    """
+
+    def __init__(self, ratio):
+        self._lock = threading.Lock()
+        self.ratio = ratio
+        self.calls = 0
+        self.hedges = 0
+
+    def record_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def try_acquire(self):
+        with self._lock:
+            if self.hedges + 1 > self.ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+
+_latency_trackers = {}
+_latency_trackers_lock = threading.Lock()
+_hedge_budget = _HedgeBudget(LLM_HEDGE_BUDGET)
+
+
+def _latency_tracker(model):
+    with _latency_trackers_lock:
+        return _latency_trackers.setdefault(model, _LatencyTracker())
+
+
+class LLMUsage:
+    """
+    Thread-safe per-model counters of LLM calls made for one job.
+
+    Records call count, errors, latency and token usage per model, and
+    derives cost from `LLM_MODEL_COSTS` (USD per 1M input / output tokens).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def _entry(self, model):
+        return self._models.setdefault(model, {
+            "calls": 0, "errors": 0, "hedges": 0, "latencies": [], "prompt_tokens": 0, "completion_tokens": 0,
+        })
+
+    def record(self, model, latency, usage=None):
+        with self._lock:
+            entry = self._entry(model)
+            entry["calls"] += 1
+            entry["latencies"].append(latency)
+            if usage is not None:
+                entry["prompt_tokens"] += usage.prompt_tokens or 0
+                entry["completion_tokens"] += usage.completion_tokens or 0
+
+    def record_error(self, model, latency):
+        with self._lock:
+            entry = self._entry(model)
+            entry["calls"] += 1
+            entry["errors"] += 1
+            entry["latencies"].append(latency)
+
+    def record_hedge(self, model):
+        with self._lock:
+            self._entry(model)["hedges"] += 1
+
+    def summary(self):
+        """
+        Latencies are per logical call, i.e. what a row waited for including any hedge.
+
+        Returns:
+            dict: Per model: calls, errors, hedges, avg/p95/p99/max latency (ms), tokens and cost (USD).
+        """
+        with self._lock:
+            result = {}
+            for model, entry in self._models.items():
+                latencies = sorted(entry["latencies"])
+                input_cost, output_cost = LLM_MODEL_COSTS.get(model, (0, 0))
+                result[model] = {
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "hedges": entry["hedges"],
+                    "avg_latency_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0,
+                    "p95_latency_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else 0,
+                    "p99_latency_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 1) if latencies else 0,
+                    "max_latency_ms": round(latencies[-1] * 1000, 1) if latencies else 0,
+                    "prompt_tokens": entry["prompt_tokens"],
+                    "completion_tokens": entry["completion_tokens"],
+                    "cost_usd": round(
+                        (entry["prompt_tokens"] * input_cost + entry["completion_tokens"] * output_cost) / 1_000_000, 6
+                    ),
+                }
+            return result
+
+
+def _attempt(model, prompt, timeout):
+    """
+    Makes one chat completion request bounded by `timeout` seconds, feeding its latency to the tracker.
+    """
+    start = time.perf_counter()
+    response = get_client().chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.2,
+        timeout=timeout,
+    )
+    _latency_tracker(model).add(time.perf_counter() - start)
+    return response
+
+
+def _is_transient(error):
+    """
+    Tells whether a failed attempt may succeed if retried: timeouts, connection errors,
+    rate limits, 408/409 and server errors. Other errors (bad request, authentication,
+    permission, not found) would fail the same way again.
+    """
+    import openai
+
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def _hedged_call(model, prompt, usage=None):
+    """
+    Runs a chat completion within `LLM_CALL_TIMEOUT`, sending one hedged duplicate if it is slower than usual.
+
+    The deadline covers the whole call: every attempt is bounded by the time left, an attempt
+    that failed with a transient error is retried (up to `LLM_MAX_RETRIES` times, with backoff)
+    only while time remains, and the call gives up with `TimeoutError` once the deadline passes.
+    Any other error is raised at once.
+
+    Once enough calls have been observed, a call still running after the model's recent
+    `LLM_HEDGE_QUANTILE` latency gets a single duplicate, provided the process-wide budget
+    (`LLM_HEDGE_BUDGET` extra calls per call) allows it. The first successful answer wins;
+    the loser is cancelled if it has not started, otherwise abandoned to its own deadline.
+    """
+    deadline = time.monotonic() + LLM_CALL_TIMEOUT
+    _hedge_budget.record_call()
+    hedge_after = _latency_tracker(model).quantile(LLM_HEDGE_QUANTILE)
+
+    executor = _get_executor()
+
+    def submit():
+        return executor.submit(_attempt, model, prompt, max(deadline - time.monotonic(), 0.001))
+
+    pending = {submit()}
+    hedged = hedge_after is None
+    retries = 0
+    error = None
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(
+            pending, timeout=remaining if hedged else min(hedge_after, remaining), return_when=FIRST_COMPLETED
+        )
+        if not done:
+            if not hedged:
+                hedged = True
+                if _hedge_budget.try_acquire():
+                    pending.add(submit())
+                    if usage is not None:
+                        usage.record_hedge(model)
+            continue
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                return future.result()
+            error = future.exception()
+            if not _is_transient(error):
+                for loser in pending:
+                    loser.cancel()
+                raise error
+        if not pending and retries < LLM_MAX_RETRIES:
+            backoff = 0.5 * 2 ** retries
+            retries += 1
+            if deadline - time.monotonic() > backoff:
+                time.sleep(backoff)
+                pending.add(submit())
+
+    for loser in pending:
+        loser.cancel()
+    if pending or error is None:
+        raise TimeoutError(f"{model} call exceeded the {LLM_CALL_TIMEOUT}s deadline")
+    raise error
+
+
+def _complete(model, prompt, usage=None):
+    """
+    Sends a single-message chat completion (hedged if slow) and returns the stripped reply text.
+    """
+    start = time.perf_counter()
+    try:
+        response = _hedged_call(model, prompt, usage)
+    except Exception:
+        if usage is not None:
+            usage.record_error(model, time.perf_counter() - start)
+        raise
+    if usage is not None:
+        usage.record(model, time.perf_counter() - start, getattr(response, "usage", None))
+    return response.choices[0].message.content.strip()
+
+
+PRODUCT_TIER_PROMPT = """
 You are an analyst at a private equity firm evaluating companies based on their business models.
 For each company, use the following fields:
 - Website: {website}
@@ -41,21 +332,8 @@ Then assign a **Tier from 1 to 4** using the rules below:
 - Return only the number: 1, 2, 3, or 4
 - Do not include any explanation, notes, or formatting.
 """
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-        )
-        result = response.choices[0].message.content.strip()
-        return int(result) if result in {"1", "2", "3", "4"} else None
-    except Exception as e:
-        print("OpenAI Error (Product Tier):", e)
-        return None
-
 
-def get_two_word_description(description, website):
-    prompt = f"""
+TWO_WORD_DESCRIPTION_PROMPT = """
 For each company, use the following values:
 - Website: {website}
 - Description: {description}
@@ -70,16 +348,68 @@ Only return the 2–3 word description. Do not include any other text or formatt
 For example, the output for https://lactanet.ca/ would be "herd management solutions"
 """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-        )
-        result = response.choices[0].message.content.strip().lower()
-        return result
-    except Exception as e:
-        print("OpenAI Error (2 Word Description):", e)
-        return ""
+# Changes whenever a prompt is edited, so cached answers to an old prompt are not reused.
+PROMPT_VERSION = hashlib.sha256((PRODUCT_TIER_PROMPT + TWO_WORD_DESCRIPTION_PROMPT).encode()).hexdigest()[:12]
+
+
+def _parse_tier(result):
+    return int(result) if result in {"1", "2", "3", "4"} else None
+
+
+def _parse_description(result):
+    result = result.lower()
+    return result if 0 < len(result.split()) <= 3 else None
+
+
+def get_product_tier(description, website, usage=None):
+    """
+    Classifies a company into a product tier (1–4) with the model cascade.
+
+    The fast model answers first; the answer is escalated to the next model only
+    when it is Tier 3 ("truly ambiguous") or cannot be parsed. A failed request
+    (timeout, rate limit, server error) is not escalated: the cascade stops there.
+
+    Returns:
+        tuple: (tier, model) — the tier and the model whose answer was used, or
+        (None, None) if no model gave a valid answer.
+    """
+    prompt = PRODUCT_TIER_PROMPT.format(description=description, website=website)
+    tier, tier_model = None, None
+    for model in CASCADE_MODELS:
+        try:
+            result = _parse_tier(_complete(model, prompt, usage))
+        except Exception as e:
+            print("OpenAI Error (Product Tier):", e)
+            break
+        if result is not None:
+            tier, tier_model = result, model
+            if result != 3:
+                break
+    return tier, tier_model
+
+
+def get_two_word_description(description, website, usage=None):
+    """
+    Generates a 2–3 word lowercase business description with the model cascade.
+
+    The answer is escalated to the next model only when it is empty or longer than three words.
+    A failed request is not escalated: the cascade stops there.
+
+    Returns:
+        tuple: (description, model) — ("", None) if no model gave a usable answer.
+    """
+    prompt = TWO_WORD_DESCRIPTION_PROMPT.format(description=description, website=website)
+
+    fallback, fallback_model = "", None
+    for model in CASCADE_MODELS:
+        try:
+            raw = _complete(model, prompt, usage)
+        except Exception as e:
+            print("OpenAI Error (2 Word Description):", e)
+            break
+        result = _parse_description(raw)
+        if result is not None:
+            return result, model
+        if raw and not fallback:
+            fallback, fallback_model = raw.lower(), model
+    return fallback, fallback_model
@@ -0,0 +1,175 @@
+import cProfile
+import marshal
+import pstats
+import time
+
+# Collapsed stacks are truncated below this depth to keep the file small.
+MAX_STACK_DEPTH = 64
+
+# cProfile paths carrying less time than this (seconds) are pruned from the collapsed stacks.
+MIN_PATH_TIME = 0.0001
+
+
+class NullProfiler:
+    """
+    Stand-in used when profiling is off: every hook is a no-op.
+    """
+
+    enabled = False
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def mark(self, name):
+        pass
+
+    def artifacts(self):
+        return {}
+
+
+class JobProfiler:
+    """
+    Profiles one task run and times its stages.
+
+    Samples the call stack with pyinstrument when it is installed, otherwise traces it
+    with cProfile. `mark()` starts a named stage (ending the previous one); wall and CPU
+    time are recorded per stage.
+
+    Produces two artifacts: a pstats file (loadable with `pstats.Stats` or snakeviz) and
+    a collapsed-stack file ("frame;frame;frame <microseconds>" per line) for flamegraph tools.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.stages = []
+        self._stage = None
+        self._running = False
+        self._sampler = None
+        self._tracer = None
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            self._tracer = cProfile.Profile()
+        else:
+            self._sampler = Profiler(async_mode="disabled")
+
+    @property
+    def engine(self):
+        return "pyinstrument" if self._sampler is not None else "cProfile"
+
+    def start(self):
+        if self._sampler is not None:
+            self._sampler.start()
+        else:
+            self._tracer.enable()
+        self._running = True
+
+    def stop(self):
+        self._end_stage()
+        if not self._running:
+            return
+        self._running = False
+        if self._sampler is not None:
+            self._sampler.stop()
+        else:
+            self._tracer.disable()
+
+    def mark(self, name):
+        self._end_stage()
+        self._stage = (name, time.perf_counter(), time.process_time())
+
+    def _end_stage(self):
+        if self._stage is None:
+            return
+        name, wall, cpu = self._stage
+        self.stages.append({
+            "stage": name,
+            "wall_s": round(time.perf_counter() - wall, 4),
+            "cpu_s": round(time.process_time() - cpu, 4),
+        })
+        self._stage = None
+
+    def _pstats_bytes(self):
+        if self._sampler is not None:
+            from pyinstrument.renderers import PstatsRenderer
+
+            return PstatsRenderer().render(self._sampler.last_session).encode("utf-8", errors="surrogateescape")
+        self._tracer.create_stats()
+        return marshal.dumps(self._tracer.stats)
+
+    def _collapsed_stacks(self):
+        lines = {}
+        if self._sampler is not None:
+            _collapse_pyinstrument(self._sampler.last_session.root_frame(), [], lines)
+        else:
+            _collapse_cprofile(pstats.Stats(self._tracer).stats, lines)
+        return "".join(f"{stack} {micros}\n" for stack, micros in lines.items() if micros > 0)
+
+    def artifacts(self):
+        """
+        Returns:
+            dict: "engine", "stages" (wall/CPU seconds per stage), "pstats" (bytes)
+            and "collapsed" (str).
+        """
+        return {
+            "engine": self.engine,
+            "stages": self.stages,
+            "pstats": self._pstats_bytes(),
+            "collapsed": self._collapsed_stacks(),
+        }
+
+
+def get_profiler(enabled):
+    """
+    Returns a `JobProfiler` if profiling was requested, otherwise a no-op `NullProfiler`.
+    """
+    return JobProfiler() if enabled else NullProfiler()
+
+
+def _collapse_pyinstrument(frame, stack, lines):
+    if frame is None or len(stack) >= MAX_STACK_DEPTH:
+        return
+    stack = stack + [f"{frame.function} ({frame.file_path_short}:{frame.line_no})"]
+    key = ";".join(stack)
+    lines[key] = lines.get(key, 0) + int(frame.total_self_time * 1_000_000)
+    for child in frame.children:
+        _collapse_pyinstrument(child, stack, lines)
+
+
+def _func_label(func):
+    filename, line_no, name = func
+    return f"{name} ({filename}:{line_no})" if line_no else name
+
+
+def _collapse_cprofile(stats, lines):
+    """
+    Approximates stacks from cProfile's caller graph.
+
+    cProfile only records caller -> callee edges, so each function's own time is split
+    across the paths reaching it in proportion to the cumulative time of each edge.
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    def visit(func, stack, share):
+        if len(stack) >= MAX_STACK_DEPTH or func in stack:
+            return
+        _, _, own_time, cum_time, _ = stats[func]
+        if cum_time * share < MIN_PATH_TIME:
+            return
+        stack = stack + [func]
+        key = ";".join(_func_label(f) for f in stack)
+        lines[key] = lines.get(key, 0) + int(own_time * share * 1_000_000)
+        for callee, edge_time in callees.get(func, []):
+            if cum_time and callee in stats and stats[callee][3]:
+                visit(callee, stack, share * min(edge_time / stats[callee][3], 1.0))
+
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            visit(func, [], 1.0)
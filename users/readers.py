@@ -0,0 +1,157 @@
+import codecs
+import io
+
+import pandas as pd
+
+from users.tiering import INPUT_COLUMNS, apply_rule_tiers, prepare_companies
+
+# Rows per DataFrame chunk handed to the tiering stage.
+CHUNK_ROWS = 10000
+
+
+def _has_calamine():
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _is_utf8(file_data, block_size=1 << 20):
+    """
+    Checks that the bytes decode as UTF-8 without materialising the decoded text.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    view = memoryview(file_data)
+    try:
+        for start in range(0, len(view), block_size):
+            decoder.decode(view[start:start + block_size])
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _keep_column(col):
+    return col in INPUT_COLUMNS
+
+
+def read_csv_chunks(file_data, chunk_rows=CHUNK_ROWS):
+    """
+    Yields DataFrame chunks of a CSV upload, restricted to the pipeline's input columns.
+
+    Decoded as UTF-8 when valid, Latin-1 otherwise.
+    """
+    encoding = "utf-8" if _is_utf8(file_data) else "latin1"
+    with pd.read_csv(io.BytesIO(file_data), encoding=encoding, usecols=_keep_column, chunksize=chunk_rows) as reader:
+        yield from reader
+
+
+def _chunk_sheet_rows(rows, chunk_rows):
+    """
+    Turns an iterator of sheet rows (header first) into DataFrame chunks of the input columns.
+
+    Blank cells may arrive as None or "" depending on the reader; both become None and
+    fully blank rows are skipped, matching `pd.read_excel`.
+    """
+    header = next(rows, ())
+    positions = [pos for pos, col in enumerate(header) if _keep_column(col)]
+    columns = [header[pos] for pos in positions]
+
+    chunk = []
+    yielded = False
+    for row in rows:
+        if all(cell is None or cell == "" for cell in row):
+            continue
+        values = [row[pos] if pos < len(row) else None for pos in positions]
+        chunk.append([None if value == "" else value for value in values])
+        if len(chunk) == chunk_rows:
+            yield pd.DataFrame(chunk, columns=columns)
+            chunk = []
+            yielded = True
+    if chunk or not yielded:
+        yield pd.DataFrame(chunk, columns=columns)
+
+
+def _read_excel_calamine(file_data, sheet_name, chunk_rows):
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_filelike(io.BytesIO(file_data))
+    try:
+        if isinstance(sheet_name, int):
+            sheet = workbook.get_sheet_by_index(sheet_name)
+        else:
+            sheet = workbook.get_sheet_by_name(sheet_name)
+        yield from _chunk_sheet_rows(iter(sheet.iter_rows()), chunk_rows)
+    finally:
+        workbook.close()
+
+
+def _read_excel_openpyxl(file_data, sheet_name, chunk_rows):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(file_data), read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        yield from _chunk_sheet_rows(worksheet.iter_rows(values_only=True), chunk_rows)
+    finally:
+        workbook.close()
+
+
+def read_excel_chunks(file_data, sheet_name=None, chunk_rows=CHUNK_ROWS):
+    """
+    Yields DataFrame chunks of an Excel upload, restricted to the pipeline's input columns.
+
+    Uses `python-calamine` when it is installed: it loads the whole sheet, but as a compact
+    grid of cell values in Rust, which is faster and far smaller than openpyxl's workbook DOM.
+    Otherwise the sheet is streamed row by row with openpyxl in read-only mode. Either way,
+    DataFrames are built per chunk from the header-matched columns only.
+
+    Args:
+        file_data (bytes): Raw content of the .xlsx file.
+        sheet_name (str, optional): Sheet to read; defaults to the first sheet.
+        chunk_rows (int): Maximum rows per yielded chunk.
+    """
+    sheet_name = sheet_name or 0
+    if _has_calamine():
+        yield from _read_excel_calamine(file_data, sheet_name, chunk_rows)
+    else:
+        yield from _read_excel_openpyxl(file_data, sheet_name, chunk_rows)
+
+
+def read_upload_chunks(file_data, filename, sheet_name=None, chunk_rows=CHUNK_ROWS):
+    """
+    Yields DataFrame chunks of an uploaded CSV or Excel file.
+
+    Args:
+        file_data (bytes): Raw content of the uploaded file.
+        filename (str): Name of the uploaded file (to determine file type).
+        sheet_name (str, optional): Excel sheet to read; ignored for CSV files.
+        chunk_rows (int): Maximum rows per yielded chunk.
+    """
+    if filename.endswith(".csv"):
+        return read_csv_chunks(file_data, chunk_rows)
+    return read_excel_chunks(file_data, sheet_name, chunk_rows)
+
+
+def read_tiered_companies(file_data, filename, config, sheet_name=None, chunk_rows=CHUNK_ROWS):
+    """
+    Loads an upload and applies the rule-based tiers chunk by chunk.
+
+    Args:
+        file_data (bytes): Raw content of the uploaded file.
+        filename (str): Name of the uploaded file (to determine file type).
+        config (dict): The user's configuration JSON.
+        sheet_name (str, optional): Excel sheet to read; ignored for CSV files.
+        chunk_rows (int): Maximum rows per chunk.
+
+    Returns:
+        pd.DataFrame: Prepared companies numbered from 1, with the rule tiers and "Pre-Product Tier".
+    """
+    chunks = []
+    next_index = 1
+    for chunk in read_upload_chunks(file_data, filename, sheet_name=sheet_name, chunk_rows=chunk_rows):
+        chunk = prepare_companies(chunk, start=next_index)
+        next_index += len(chunk)
+        chunks.append(apply_rule_tiers(chunk, config))
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
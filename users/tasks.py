@@ -1,46 +1,70 @@
 from celery import shared_task
 
-from .utilities import generate_descriptions_and_tiers_with_progress, clear_progress, save_progress
+from .profiling import get_profiler
+from .utilities import (
+    JobHeartbeat, TaskCancelled, clear_progress, generate_descriptions_and_tiers_with_progress, release_job,
+    save_llm_usage, save_progress,
+)
 
 
 @shared_task(bind=True)
-def process_uploaded_file(self, file_data_b64, filename, user_id):
+def process_uploaded_file(self, file_data_b64, filename, user_id, job_key=None, sheet_name=None, profile=False):
     """
     Celery task to process an uploaded file (CSV or Excel) containing company data.
 
     Steps:
     - Decodes the base64-encoded file.
-    - Loads it into a pandas DataFrame and cleans/prepares numeric fields.
+    - Loads it into pandas DataFrame chunks (input columns only) and cleans/prepares numeric fields.
     - Applies tiering logic based on user-specific configuration:
         - Founding year, fundraiser date, total raised, FTE, ownership, and country.
     - Tracks and saves progress in cache per user.
-    - Uses GPT-based helpers to generate product tiers and business descriptions.
+    - Uses GPT-based helpers (fast model first, escalating ambiguous rows) to generate product tiers
+      and business descriptions, recording the model used per row.
+      Companies repeated in the file or cached from earlier jobs are not sent again.
     - Computes final rankings and filters Tier 4 companies.
     - Outputs two Excel files:
         - Processed: For presentation.
         - Action: For internal use, includes GPT-generated data.
     - Returns both files as base64-encoded strings.
+    - Stops between rows if a cancellation is requested for this task.
+    - Keeps a heartbeat while it runs, so uploads stop joining it if its worker dies.
+    - Optionally profiles the run, returning per-stage wall/CPU times and profile files.
 
     Args:
         self: Celery task instance (for binding).
         file_data_b64 (str): Base64-encoded file content.
         filename (str): Name of the uploaded file (to determine file type).
         user_id (int): ID of the user initiating the task (used for config & progress).
+        job_key (str, optional): Key from `get_job_key()`; released if the task does not succeed.
+        sheet_name (str, optional): Excel sheet to process; defaults to the first sheet.
+        profile (bool): Run under the job profiler (see `users.profiling`).
 
     Returns:
         dict: A dictionary with:
-            - "status": "success" or "error"
+            - "status": "success", "cancelled" or "error"
             - "processed_excel": base64-encoded processed Excel file (if success)
             - "action_excel": base64-encoded action Excel file (if success)
+            - "llm_stats": per-model calls, latency, tokens and cost of the job (if success)
+            - "profile": engine, stage timings and base64-encoded pstats / collapsed stacks
+              (if success and profiling was requested)
             - "message": error message (if error)
     """
+    heartbeat = JobHeartbeat(self.request.id)
+    profiler = get_profiler(profile)
     try:
+        heartbeat.start()
+        profiler.start()
+        profiler.mark("load")
+        from users.llm_helpers import LLMUsage
         from users.models import User
+        from users.readers import read_tiered_companies
+        from users.tiering import assign_enrichment, build_output_frames
         import base64, io, pandas as pd
 
         file_data = base64.b64decode(file_data_b64)
         user = User.objects.filter(id=user_id).first()
         if not user:
+            release_job(job_key, self.request.id)
             return {"status": "error", "message": "User not found"}
 
         config = user.configuration.configuration_json
@@ -48,135 +72,42 @@ def process_uploaded_file(self, file_data_b64, filename, user_id):
         # Clear any previous progress
         clear_progress(user_id)
 
-        # Load DataFrame
-        if filename.endswith(".csv"):
-            try:
-                df = pd.read_csv(io.BytesIO(file_data), encoding="utf-8")
-            except Exception:
-                df = pd.read_csv(io.BytesIO(file_data), encoding="latin1")
-        else:
-            df = pd.read_excel(io.BytesIO(file_data))
-
-        df = df[df["Company Name"].notna()].reset_index(drop=True)
-        df["Founding Year"] = pd.to_numeric(df.get("Founding Year"), errors="coerce")
-        df["Total Raised"] = pd.to_numeric(df.get("Total Raised"), errors="coerce")
-        df["Employee Count"] = pd.to_numeric(df.get("Employee Count"), errors="coerce")
-        df["Index"] = df.index + 1  # needed for merge after GPT
-
-        # Tiers
-        def get_founding_tier(year):
-            if pd.isna(year): return None
-            year = int(year)
-            for tier, max_year in config["founding_year"].items():
-                if year <= int(max_year):
-                    return int(tier[-1])
-            return 4
-
-        def get_fundraise_tier(date_str):
-            if pd.isna(date_str): return 3
-            try:
-                year = pd.to_datetime(date_str).year
-                for tier, val in config["fundraiser_year"].items():
-                    if year <= int(val): return int(tier[-1])
-            except Exception:
-                pass
-            return 3
-
-        def get_total_raised_tier(row):
-            raised = row["Total Raised"]
-            owner = row["Ownership"]
-            if pd.isna(raised) or pd.isna(owner): return None
-            owner_group = owner if owner in config["total_raised"]["tier_1"] else "Others"
-            for tier in ["tier_1", "tier_1_extra", "tier_2", "tier_3"]:
-                limit = config["total_raised"].get(tier, {}).get(owner_group)
-                if limit is not None:
-                    try:
-                        if float(raised) <= float(limit):
-                            return int(tier[-1])
-                    except Exception:
-                        continue
-            return 4
-
-        def get_fte_tier(row):
-            fte = row["Employee Count"]
-            ownership = row["Ownership"]
-            if pd.isna(fte) or pd.isna(ownership): return None
-            try:
-                fte = int(fte)
-                for tier, rule in config["FTE_Count"].items():
-                    limits = rule.get(ownership)
-                    if limits and limits.get("min") <= fte <= limits.get("max"):
-                        return int(tier[-1])
-            except Exception:
-                return None
-            return 4
-
-        # Apply tiering
-        df["country_tier"] = df["Country"].map(config.get("country", {}))
-        df["ownership_tier"] = df["Ownership"].map(config.get("Ownership", {}))
-        df["founding_tier"] = df["Founding Year"].apply(get_founding_tier)
-        df["fundraise_tier"] = df["Date of Most Recent Investment"].apply(get_fundraise_tier)
-        df["raised_tier"] = df.apply(get_total_raised_tier, axis=1)
-        df["fte_tier"] = df.apply(get_fte_tier, axis=1)
-
-        df["Pre-Product Tier"] = df[[  # max of all rules
-            "country_tier", "ownership_tier", "founding_tier",
-            "fundraise_tier", "raised_tier", "fte_tier"
-        ]].max(axis=1)
-
-        # Filter rows needing GPT
-        df_gpt = df[df["Pre-Product Tier"] != 4].copy()
+        profiler.mark("ingest")
+
+        # Load the upload chunk by chunk (input columns only) and tier each chunk
+        df = read_tiered_companies(file_data, filename, config, sheet_name=sheet_name)
+        del file_data
+
+        for col in ("Country", "Ownership"):
+            df[col] = df[col].astype("category")
+
+        # Rows needing GPT: only the columns the prompts use
+        needs_gpt = df["Pre-Product Tier"].ne(4).fillna(True).astype(bool)
+        df_gpt = df.loc[needs_gpt, [col for col in ("Description", "Website") if col in df.columns]]
 
         # Save progress for GPT step (2 steps per row)
         total_gpt_rows = len(df_gpt)
         save_progress(user.id, 0, total_gpt_rows * 2)
 
         # Run GPT task
-        product_tiers, descriptions = generate_descriptions_and_tiers_with_progress(df_gpt, user.id)
-
-        df_gpt["Product Tier - CHAT GPT"] = pd.Series(product_tiers).apply(pd.to_numeric, errors="coerce").fillna(0)
-        df_gpt["2 Word Description"] = descriptions
-
-        # Merge GPT results back into full df
-        df = df.merge(
-            df_gpt[["Index", "Product Tier - CHAT GPT", "2 Word Description"]],
-            on="Index", how="left"
+        profiler.mark("enrichment")
+        usage = LLMUsage()
+        enrichment = generate_descriptions_and_tiers_with_progress(
+            df_gpt, user.id, task_id=self.request.id, usage=usage
         )
+        save_llm_usage(usage)
+
+        # Assign GPT results back by index alignment; rows skipped by GPT get 0 / NaN
+        assign_enrichment(df, enrichment, df_gpt.index)
+        del df_gpt, enrichment
 
         # Final post-tier and ordering
-        df["Product Tier - CHAT GPT"] = df["Product Tier - CHAT GPT"].fillna(0)
-        df["Post Tier"] = df[["Pre-Product Tier", "Product Tier - CHAT GPT"]].max(axis=1)
-        df["Post_Order"] = df["Post Tier"] * 10000 - df["Index"]
-        df["Post Rank"] = df["Post_Order"].rank(method="min", ascending=True).astype(int)
-        df["Tier"] = df["Post Tier"]
-
-        # Filter Tier 4
-        df = df[df["Post Tier"] != 4]
-        df = df.sort_values(by=["Post Tier", "Employee Count"], ascending=[True, False])
-
-        final_columns = [
-            "Post Rank", "Tier", "Company Name", "Informal Name", "Founding Year", "Country",
-            "Website", "Description", "Employee Count", "Ownership", "Total Raised",
-            "Date of Most Recent Investment", "Executive Title", "Executive First Name",
-            "Executive Last Name", "Executive Email", "Investors", "2 Word Description"
-        ]
-        processed_df = df[[col for col in final_columns if col in df.columns]].copy()
-        processed_df.rename(columns={
-            "Employee Count": "Count",
-            "Company Name": "Name"
-        }, inplace=True)
-
-        # Action sheet
-        df["2 Word Description - CHAT GPT"] = df["2 Word Description"]
-        df["Include"] = ""
-        action_columns = [
-            "Pre-Product Tier", "Post Tier", "Post_Order", "Post Rank", "Index",
-            "Include", "Company Name", "Website", "Description", "Employee Count",
-            "Product Tier - CHAT GPT", "2 Word Description - CHAT GPT"
-        ]
-        action_df = df[[col for col in action_columns if col in df.columns]].copy()
+        profiler.mark("ranking")
+        processed_df, action_df = build_output_frames(df)
+        del df
 
         # Create Excel files
+        profiler.mark("excel")
         processed_output = io.BytesIO()
         action_output = io.BytesIO()
 
@@ -206,12 +137,33 @@ def process_uploaded_file(self, file_data_b64, filename, user_id):
         action_output.seek(0)
         save_progress(user.id, 100, 100)
 
-        return {
+        result = {
             "status": "success",
             "processed_excel": base64.b64encode(processed_output.getvalue()).decode(),
             "action_excel": base64.b64encode(action_output.getvalue()).decode(),
+            "llm_stats": usage.summary(),
         }
+        if profiler.enabled:
+            profiler.stop()
+            artifacts = profiler.artifacts()
+            result["profile"] = {
+                "engine": artifacts["engine"],
+                "stages": artifacts["stages"],
+                "pstats": base64.b64encode(artifacts["pstats"]).decode(),
+                "collapsed": base64.b64encode(artifacts["collapsed"].encode()).decode(),
+            }
+        return result
+
+    except TaskCancelled:
+        release_job(job_key, self.request.id)
+        save_progress(user_id, 0, 1)
+        return {"status": "cancelled"}
 
     except Exception as e:
+        release_job(job_key, self.request.id)
         save_progress(user_id, 1, 1)
         return {"status": "error", "message": str(e)}
+
+    finally:
+        profiler.stop()
+        heartbeat.stop()
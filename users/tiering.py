@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+
+
+# Columns read from uploads; anything else is dropped at load time.
+INPUT_COLUMNS = [
+    "Company Name", "Informal Name", "Founding Year", "Country", "Website", "Description",
+    "Employee Count", "Ownership", "Total Raised", "Date of Most Recent Investment",
+    "Executive Title", "Executive First Name", "Executive Last Name", "Executive Email", "Investors",
+]
+
+RULE_TIER_COLUMNS = [
+    "country_tier", "ownership_tier", "founding_tier",
+    "fundraise_tier", "raised_tier", "fte_tier",
+]
+
+
+def _map_tier(series, mapping):
+    """
+    Maps each value of a column to its configured tier as a small nullable integer.
+    """
+    return pd.to_numeric(series.map(mapping).astype(object), errors="coerce").astype("Int8")
+
+
+def _threshold_tier(values, thresholds, default):
+    """
+    Assigns the first tier whose upper limit is not exceeded by each value.
+
+    Args:
+        values (pd.Series): Numeric values (NaN for missing).
+        thresholds (Iterable[tuple[int, float]]): (tier, limit) pairs in evaluation order.
+        default (int): Tier for present values that exceed every limit.
+
+    Returns:
+        pd.Series: Int8 tiers, NA where the value is missing.
+    """
+    tiers = pd.Series(pd.NA, index=values.index, dtype="Int8")
+    unset = values.notna()
+    for tier, limit in thresholds:
+        hit = unset & (values <= limit)
+        tiers[hit] = tier
+        unset &= ~hit
+    tiers[unset] = default
+    return tiers
+
+
+def _year_thresholds(section):
+    """
+    Parses a `{"tier_N": "YYYY"}` config section, stopping at the first blank or invalid year.
+    """
+    thresholds = []
+    for tier, val in section.items():
+        try:
+            thresholds.append((int(tier[-1]), int(val)))
+        except Exception:
+            break
+    return thresholds
+
+
+def _total_raised_tier(df, config):
+    raised = df["Total Raised"]
+    owner = df["Ownership"]
+    owner_group = owner.where(owner.isin(list(config["total_raised"]["tier_1"])), "Others")
+    tiers = pd.Series(pd.NA, index=df.index, dtype="Int8")
+    unset = raised.notna() & owner.notna()
+    for tier in ["tier_1", "tier_1_extra", "tier_2", "tier_3"]:
+        for group, limit in config["total_raised"].get(tier, {}).items():
+            if limit is None:
+                continue
+            try:
+                limit = float(limit)
+            except Exception:
+                continue
+            hit = unset & (owner_group == group) & (raised <= limit)
+            tiers[hit] = int(tier[-1])
+            unset &= ~hit
+    tiers[unset] = 4
+    return tiers
+
+
+def _fte_tier(df, config):
+    fte = np.trunc(df["Employee Count"])
+    ownership = df["Ownership"]
+    tiers = pd.Series(pd.NA, index=df.index, dtype="Int8")
+    unset = fte.notna() & ownership.notna()
+    for tier, rule in config["FTE_Count"].items():
+        for owner, limits in rule.items():
+            if not limits:
+                continue
+            rows = unset & (ownership == owner)
+            low, high = limits.get("min"), limits.get("max")
+            if low is None:
+                # No minimum: the row cannot be tiered on headcount
+                unset &= ~rows
+                continue
+            if high is None:
+                # No maximum: rows below the minimum fall through to later tiers,
+                # the others cannot be tiered on headcount
+                unset &= ~(rows & (fte >= low))
+                continue
+            hit = rows & (fte >= low) & (fte <= high)
+            tiers[hit] = int(tier[-1])
+            unset &= ~hit
+    tiers[unset] = 4
+    return tiers
+
+
+def prepare_companies(df, start=1):
+    """
+    Drops rows without a company name and normalises the numeric input columns.
+
+    Adds an `Index` column numbering the remaining rows from `start`; it identifies rows
+    in both output sheets and in the streaming API.
+
+    Args:
+        df (pd.DataFrame): Raw company data as loaded from an upload (or one chunk of it).
+        start (int): Index of the first remaining row, for numbering across chunks.
+
+    Returns:
+        pd.DataFrame: The cleaned DataFrame (the input itself when no row was dropped).
+    """
+    named = df["Company Name"].notna()
+    if not named.all():
+        df = df.loc[named].reset_index(drop=True)
+    df["Founding Year"] = pd.to_numeric(df.get("Founding Year"), errors="coerce", downcast="float")
+    df["Total Raised"] = pd.to_numeric(df.get("Total Raised"), errors="coerce")
+    df["Employee Count"] = pd.to_numeric(df.get("Employee Count"), errors="coerce", downcast="float")
+    df["Index"] = np.arange(start, start + len(df), dtype=np.int32)
+    return df
+
+
+def apply_rule_tiers(df, config):
+    """
+    Adds the rule-based tier columns and the resulting `Pre-Product Tier` to the DataFrame.
+
+    Each rule is evaluated column-wise against the user's configuration:
+    country, ownership, founding year, most recent fundraise, total raised and FTE count.
+    Tiers are stored as nullable Int8 columns and the pre-product tier is the max of all rules.
+
+    Args:
+        df (pd.DataFrame): Company data with numeric `Founding Year`, `Total Raised`
+            and `Employee Count` columns. Modified in place.
+        config (dict): The user's configuration JSON.
+
+    Returns:
+        pd.DataFrame: The same DataFrame, for chaining.
+    """
+    founding_years = np.trunc(df["Founding Year"])
+    fundraise_years = pd.to_datetime(
+        df["Date of Most Recent Investment"], errors="coerce", format="mixed"
+    ).dt.year
+
+    df["country_tier"] = _map_tier(df["Country"], config.get("country", {}))
+    df["ownership_tier"] = _map_tier(df["Ownership"], config.get("Ownership", {}))
+    df["founding_tier"] = _threshold_tier(founding_years, _year_thresholds(config["founding_year"]), 4)
+    df["fundraise_tier"] = _threshold_tier(fundraise_years, _year_thresholds(config["fundraiser_year"]), 3).fillna(3)
+    df["raised_tier"] = _total_raised_tier(df, config)
+    df["fte_tier"] = _fte_tier(df, config)
+
+    df["Pre-Product Tier"] = df[RULE_TIER_COLUMNS].max(axis=1).astype("Int8")
+    return df
+
+
+def assign_enrichment(df, enrichment, index):
+    """
+    Adds the LLM enrichment columns to `df` in place, aligned on the enriched rows' index.
+
+    Rows that were not enriched get Product Tier 0 and empty descriptions and models.
+
+    Args:
+        df (pd.DataFrame): All companies.
+        enrichment (dict): One list per enrichment column, as returned by
+            `generate_descriptions_and_tiers_with_progress()`.
+        index (pd.Index): Index labels of the enriched rows, in list order.
+    """
+    for col, values in enrichment.items():
+        df[col] = pd.Series(values, index=index, dtype=object)
+    df["Product Tier - CHAT GPT"] = (
+        pd.to_numeric(df["Product Tier - CHAT GPT"], errors="coerce").fillna(0).astype("int8")
+    )
+    for col in ("Product Tier Model", "2 Word Description Model"):
+        df[col] = df[col].astype("category")
+
+
+def build_output_frames(df):
+    """
+    Ranks the companies and selects the rows and columns of both output sheets.
+
+    Adds "Post Tier", "Post_Order", "Post Rank" and "Tier" to `df`, drops Tier 4 and orders
+    by tier, then by descending employee count.
+
+    Returns:
+        tuple: (processed_df, action_df) — the presentation and internal action sheets.
+    """
+    df["Post Tier"] = df[["Pre-Product Tier", "Product Tier - CHAT GPT"]].max(axis=1).astype("Int8")
+    df["Post_Order"] = df["Post Tier"].astype("Int64") * 10000 - df["Index"]
+    df["Post Rank"] = df["Post_Order"].rank(method="min", ascending=True).astype(int)
+    df["Tier"] = df["Post Tier"]
+
+    # Filter Tier 4 and order rows; output frames select from df by this order
+    order = (
+        df.loc[df["Post Tier"].ne(4).fillna(True).astype(bool), ["Post Tier", "Employee Count"]]
+        .sort_values(by=["Post Tier", "Employee Count"], ascending=[True, False])
+        .index
+    )
+
+    final_columns = [
+        "Post Rank", "Tier", "Company Name", "Informal Name", "Founding Year", "Country",
+        "Website", "Description", "Employee Count", "Ownership", "Total Raised",
+        "Date of Most Recent Investment", "Executive Title", "Executive First Name",
+        "Executive Last Name", "Executive Email", "Investors", "2 Word Description"
+    ]
+    processed_df = df.loc[order, [col for col in final_columns if col in df.columns]]
+    processed_df.columns = [
+        {"Employee Count": "Count", "Company Name": "Name"}.get(col, col) for col in processed_df.columns
+    ]
+
+    # Action sheet
+    action_columns = [
+        "Pre-Product Tier", "Post Tier", "Post_Order", "Post Rank", "Index",
+        "Company Name", "Website", "Description", "Employee Count",
+        "Product Tier - CHAT GPT", "2 Word Description", "Product Tier Model", "2 Word Description Model"
+    ]
+    action_df = df.loc[order, [col for col in action_columns if col in df.columns]]
+    action_df.columns = [
+        "2 Word Description - CHAT GPT" if col == "2 Word Description" else col for col in action_df.columns
+    ]
+    action_df.insert(action_df.columns.get_loc("Index") + 1, "Include", "")
+    return processed_df, action_df
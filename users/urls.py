@@ -3,8 +3,11 @@ from django.conf.urls.static import static
 from django.urls import path
 
 from users.views import configuration
+from users.views.cancel_task import cancel_task
 from users.views.configuration import submit_configuration, get_configuration
-from users.views.task_status import task_status
+from users.views.enrich_stream import enrich_stream
+from users.views.llm_stats import llm_stats
+from users.views.task_status import task_profile, task_status
 from users.views.upload_csv import UploadAndTierView
 
 urlpatterns = [
@@ -13,6 +16,10 @@ urlpatterns = [
     path("get-configuration/", get_configuration, name="get-configuration"),
     path("upload-csv/", UploadAndTierView.as_view(), name="upload_csv"),
     path('task-status/<str:task_id>/', task_status, name='task_status'),
+    path('task-profile/<str:task_id>/<str:kind>/', task_profile, name='task_profile'),
+    path('cancel-task/<str:task_id>/', cancel_task, name='cancel_task'),
+    path("api/enrich/", enrich_stream, name="enrich_stream"),
+    path("llm-stats/", llm_stats, name="llm_stats"),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,7 +1,9 @@
-import pandas as pd
-from django.core.cache import cache
+import hashlib
+import json
+import threading
 
-from users.llm_helpers import get_product_tier, get_two_word_description
+from django.conf import settings
+from django.core.cache import cache
 
 
 def save_progress(user_id, current, total):
@@ -35,49 +37,400 @@ def clear_progress(user_id):
     cache.delete(f"progress_{user_id}")
 
 
-def generate_descriptions_and_tiers_with_progress(df, user_id):
+class TaskCancelled(Exception):
+    """
+    Raised inside a running task when a cancellation has been requested for it.
+    """
+
+
+# A job's key is kept as long as Celery keeps its result.
+JOB_TIMEOUT = 60 * 60 * 24
+
+# A running task refreshes its heartbeat every JOB_HEARTBEAT_INTERVAL seconds; once it is
+# JOB_HEARTBEAT_TIMEOUT seconds old the task is considered lost with its worker.
+JOB_HEARTBEAT_INTERVAL = 30
+JOB_HEARTBEAT_TIMEOUT = 60 * 3
+
+
+def get_job_key(file_data, config, sheet_name=None):
+    """
+    Builds a key identifying a processing job by its inputs.
+
+    Two uploads share a key when the file content, the selected sheet and the
+    configuration they are tiered against are identical, so their results are interchangeable.
+
+    Args:
+        file_data (bytes): Raw content of the uploaded file.
+        config (dict): The user's configuration JSON.
+        sheet_name (str, optional): Excel sheet selected for processing.
+
+    Returns:
+        str: A hex digest combining the file hash and the configuration version.
+    """
+    file_hash = hashlib.sha256(file_data).hexdigest()
+    config_version = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+    return hashlib.sha256(f"{file_hash}:{config_version}:{sheet_name or ''}".encode()).hexdigest()
+
+
+def claim_job(job_key, task_id):
+    """
+    Registers a task as the owner of a job key if no other task holds it.
+
+    Args:
+        job_key (str): Key returned by `get_job_key()`.
+        task_id (str): ID of the Celery task that will process the job.
+
+    Returns:
+        bool: True if the key was claimed, False if another task already holds it.
+
+    Cache:
+        Stored under 'job_<job_key>' for 24 hours.
+        The task's key is stored under 'task_job_<task_id>' so a cancel can release it.
+    """
+    if not cache.add(f"job_{job_key}", task_id, timeout=JOB_TIMEOUT):
+        return False
+    cache.set(f"task_job_{task_id}", job_key, timeout=JOB_TIMEOUT)
+    return True
+
+
+def replace_job(job_key, task_id):
+    """
+    Overwrites the task registered for a job key (used when the previous one failed).
+    """
+    cache.set(f"job_{job_key}", task_id, timeout=JOB_TIMEOUT)
+    cache.set(f"task_job_{task_id}", job_key, timeout=JOB_TIMEOUT)
+
+
+def get_job_task_id(job_key):
+    """
+    Returns the ID of the task registered for a job key, or None.
+    """
+    return cache.get(f"job_{job_key}")
+
+
+def release_job(job_key, task_id):
+    """
+    Removes a job key registration, provided it still points to the given task.
+    """
+    if job_key and cache.get(f"job_{job_key}") == task_id:
+        cache.delete(f"job_{job_key}")
+
+
+def release_task_job(task_id):
+    """
+    Removes the job key registration of a task, if it still holds one (used on cancel).
+    """
+    release_job(cache.get(f"task_job_{task_id}"), task_id)
+
+
+class JobHeartbeat:
+    """
+    Marks a task as alive between `start()` and `stop()`.
+
+    A daemon thread refreshes the task's heartbeat every `JOB_HEARTBEAT_INTERVAL` seconds,
+    so the heartbeat expires soon after the worker process dies, whatever stage it was in.
+
+    Cache:
+        Stored under 'job_alive_<task_id>' for `JOB_HEARTBEAT_TIMEOUT` seconds,
+        deleted by `stop()`.
+    """
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+
+    def _beat(self):
+        while not self._stop.wait(JOB_HEARTBEAT_INTERVAL):
+            cache.set(f"job_alive_{self.task_id}", True, timeout=JOB_HEARTBEAT_TIMEOUT)
+
+    def start(self):
+        cache.set(f"job_alive_{self.task_id}", True, timeout=JOB_HEARTBEAT_TIMEOUT)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        cache.delete(f"job_alive_{self.task_id}")
+
+
+def is_job_alive(task_id):
+    """
+    Returns True if the task's `JobHeartbeat` is still fresh.
+    """
+    return bool(cache.get(f"job_alive_{task_id}"))
+
+
+def request_cancel(task_id):
+    """
+    Flags a task for cancellation. The task stops at its next checkpoint.
+
+    Cache:
+        Stored under 'cancel_<task_id>' for 24 hours.
+    """
+    cache.set(f"cancel_{task_id}", True, timeout=JOB_TIMEOUT)
+
+
+def is_cancelled(task_id):
+    """
+    Returns True if a cancellation has been requested for the given task.
+    """
+    return bool(task_id) and bool(cache.get(f"cancel_{task_id}"))
+
+
+# Output columns produced by the LLM enrichment step, per row.
+ENRICHMENT_COLUMNS = [
+    "Product Tier - CHAT GPT", "2 Word Description", "Product Tier Model", "2 Word Description Model",
+]
+
+
+def _text(value):
+    return "" if value is None or value != value else str(value).strip()
+
+
+def get_enrichment_key(description, website):
+    """
+    Builds the cache key of a company's LLM enrichment.
+
+    Companies with the same description and website (ignoring surrounding whitespace)
+    share a key. The model cascade and the prompt version are part of the key, so changing
+    a model or editing a prompt does not serve answers produced by the old one.
+
+    Returns:
+        str: 'enrich_<sha256 hex digest>'.
+    """
+    from users.llm_helpers import CASCADE_MODELS, PROMPT_VERSION
+
+    version = f"{PROMPT_VERSION}|{'|'.join(CASCADE_MODELS)}"
+    digest = hashlib.sha256(f"{version}\x00{_text(description)}\x00{_text(website)}".encode()).hexdigest()
+    return f"enrich_{digest}"
+
+
+def get_cached_enrichments(keys):
+    """
+    Returns the cached enrichments among the given keys, as a dict of key -> values.
+
+    Always empty when the cache is disabled (`LLM_ENRICHMENT_CACHE_TIMEOUT` = 0).
+    """
+    if not settings.LLM_ENRICHMENT_CACHE_TIMEOUT:
+        return {}
+    return cache.get_many(list(keys))
+
+
+def cache_enrichment(key, values):
+    """
+    Stores a company's enrichment, unless a helper got no usable answer (e.g. during an outage).
+
+    Cache:
+        Stored under the key from `get_enrichment_key()` for `LLM_ENRICHMENT_CACHE_TIMEOUT`
+        seconds (not at all if it is 0).
+    """
+    if not settings.LLM_ENRICHMENT_CACHE_TIMEOUT:
+        return
+    if values["Product Tier - CHAT GPT"] is None or not values["2 Word Description"]:
+        return
+    if values["Product Tier Model"] is None or values["2 Word Description Model"] is None:
+        return
+    cache.set(key, values, timeout=settings.LLM_ENRICHMENT_CACHE_TIMEOUT)
+
+
+def generate_descriptions_and_tiers_with_progress(df, user_id, task_id=None, usage=None):
     """
     Processes each row in the given DataFrame to generate product tiers and two-word descriptions
     using LLM-based helper functions. Tracks and saves progress for each step.
 
-    For each row, this function:
+    Rows sharing a description and website are enriched once, and companies enriched by an
+    earlier job are served from the cache (see `get_enrichment_key()`). For each remaining
+    company, this function:
     - Calls `get_product_tier()` to determine a tier based on the description and website.
     - Calls `get_two_word_description()` to generate a brief business description.
+    - Records which model of the cascade produced each answer.
     - Saves progress after each step to allow real-time progress tracking.
+    - Checks for a cancellation request before each row.
 
     Args:
         df (pd.DataFrame): The input DataFrame containing company data.
         user_id (int): ID of the user for whom progress is being tracked.
+        task_id (str, optional): ID of the running task, used to detect cancellation.
+        usage (LLMUsage, optional): Collector for per-model call statistics.
 
     Returns:
-        tuple: A tuple of two lists:
-            - product_tiers (list[int]): List of generated product tier values (1–4 or 0 on failure).
-            - descriptions (list[str]): List of generated 2–3 word business descriptions.
+        dict: One list per name in `ENRICHMENT_COLUMNS`, in row order:
+            - product tiers (1–4, None or 0 on failure)
+            - 2–3 word business descriptions
+            - model used for each product tier
+            - model used for each description
+
+    Raises:
+        TaskCancelled: If the task was cancelled while rows were still pending.
     """
-    total_rows = len(df)
-    total_steps = total_rows * 2
+    from users.llm_helpers import get_product_tier, get_two_word_description
+
+    descriptions = df["Description"] if "Description" in df.columns else [""] * len(df)
+    websites = df["Website"] if "Website" in df.columns else [""] * len(df)
+    rows = list(zip(descriptions, websites))
+    keys = [get_enrichment_key(description, website) for description, website in rows]
+
+    # One LLM round-trip per distinct company that is not cached yet
+    enriched = get_cached_enrichments(set(keys))
+    pending = {}
+    for key, row in zip(keys, rows):
+        if key not in enriched:
+            pending.setdefault(key, row)
+
+    total_steps = len(pending) * 2
     current = 0
 
-    product_tiers = []
-    descriptions = []
+    for key, (description, website) in pending.items():
+        if is_cancelled(task_id):
+            raise TaskCancelled()
 
-    for _, row in df.iterrows():
         # Product Tier
         try:
-            product_tier = get_product_tier(row.get("Description", ""), row.get("Website", ""))
+            product_tier, tier_model = get_product_tier(description, website, usage)
         except:
-            product_tier = 0
-        product_tiers.append(product_tier)
+            product_tier, tier_model = 0, None
         current += 1
         save_progress(user_id, current, total_steps)
 
         # Description
         try:
-            desc = get_two_word_description(row.get("Description", ""), row.get("Website", ""))
+            desc, desc_model = get_two_word_description(description, website, usage)
         except:
-            desc = ""
-        descriptions.append(desc)
+            desc, desc_model = "", None
         current += 1
         save_progress(user_id, current, total_steps)
 
-    return product_tiers, descriptions
+        enriched[key] = {
+            "Product Tier - CHAT GPT": product_tier,
+            "2 Word Description": desc,
+            "Product Tier Model": tier_model,
+            "2 Word Description Model": desc_model,
+        }
+        cache_enrichment(key, enriched[key])
+
+    return {col: [enriched[key][col] for key in keys] for col in ENRICHMENT_COLUMNS}
+
+
+def enrich_company(description, website, usage=None):
+    """
+    Runs both LLM helpers for a single company, or returns its cached enrichment.
+
+    Args:
+        description (str): The company description.
+        website (str): The company website.
+        usage (LLMUsage, optional): Collector for per-model call statistics.
+
+    Returns:
+        dict: Values for each name in `ENRICHMENT_COLUMNS`, with 0 / "" when a helper fails.
+    """
+    from users.llm_helpers import get_product_tier, get_two_word_description
+
+    key = get_enrichment_key(description, website)
+    cached = get_cached_enrichments([key]).get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        product_tier, tier_model = get_product_tier(description, website, usage)
+    except Exception:
+        product_tier, tier_model = 0, None
+    try:
+        desc, desc_model = get_two_word_description(description, website, usage)
+    except Exception:
+        desc, desc_model = "", None
+    values = {
+        "Product Tier - CHAT GPT": product_tier,
+        "2 Word Description": desc,
+        "Product Tier Model": tier_model,
+        "2 Word Description Model": desc_model,
+    }
+    cache_enrichment(key, values)
+    return values
+
+
+LLM_STATS_FIELDS = ["calls", "errors", "latency_ms", "prompt_tokens", "completion_tokens", "cost_microusd"]
+
+LLM_STATS_TIMEOUT = 60 * 60 * 24 * 30
+
+# Number of recent jobs whose LLM statistics are kept individually (see `get_recent_llm_usage()`).
+RECENT_LLM_JOBS = 20
+
+
+def save_llm_usage(usage):
+    """
+    Adds a job's per-model LLM statistics to the running totals in Django's cache,
+    and records them as one of the recent jobs.
+
+    Cache:
+        Integer counters under 'llm_stats_<model>_<field>', incremented atomically
+        so concurrent workers do not overwrite each other. The job's own statistics go to
+        'llm_recent_job_<slot>', one of `RECENT_LLM_JOBS` slots picked round-robin by the
+        atomic counter 'llm_recent_seq'. Kept for 30 days.
+    """
+    job = {}
+    for model, stats in usage.summary().items():
+        deltas = {
+            "calls": stats["calls"],
+            "errors": stats["errors"],
+            "latency_ms": int(stats["avg_latency_ms"] * stats["calls"]),
+            "prompt_tokens": stats["prompt_tokens"],
+            "completion_tokens": stats["completion_tokens"],
+            "cost_microusd": int(stats["cost_usd"] * 1_000_000),
+        }
+        for field, delta in deltas.items():
+            key = f"llm_stats_{model}_{field}"
+            cache.add(key, 0, timeout=LLM_STATS_TIMEOUT)
+            cache.incr(key, delta)
+        job[model] = deltas
+
+    if job:
+        cache.add("llm_recent_seq", 0, timeout=LLM_STATS_TIMEOUT)
+        slot = cache.incr("llm_recent_seq") % RECENT_LLM_JOBS
+        cache.set(f"llm_recent_job_{slot}", job, timeout=LLM_STATS_TIMEOUT)
+
+
+def _usage_totals(stats):
+    return {
+        "calls": stats["calls"],
+        "errors": stats["errors"],
+        "avg_latency_ms": round(stats["latency_ms"] / stats["calls"], 1),
+        "prompt_tokens": stats["prompt_tokens"],
+        "completion_tokens": stats["completion_tokens"],
+        "cost_usd": round(stats["cost_microusd"] / 1_000_000, 6),
+    }
+
+
+def get_llm_usage_totals(models):
+    """
+    Returns the running per-model LLM statistics for the given models.
+
+    Returns:
+        dict: Per model with at least one call: calls, errors, average latency (ms),
+        token counts and cost (USD).
+    """
+    totals = {}
+    for model in models:
+        values = cache.get_many([f"llm_stats_{model}_{field}" for field in LLM_STATS_FIELDS])
+        stats = {field: values.get(f"llm_stats_{model}_{field}", 0) for field in LLM_STATS_FIELDS}
+        if stats["calls"]:
+            totals[model] = _usage_totals(stats)
+    return totals
+
+
+def get_recent_llm_usage(models):
+    """
+    Returns per-model LLM statistics summed over the last `RECENT_LLM_JOBS` jobs.
+
+    Returns:
+        tuple: (jobs, stats) — the number of recent jobs found and, per model with at
+        least one call, the same fields as `get_llm_usage_totals()`.
+    """
+    jobs = cache.get_many([f"llm_recent_job_{slot}" for slot in range(RECENT_LLM_JOBS)]).values()
+    recent = {}
+    for model in models:
+        stats = {field: sum(job.get(model, {}).get(field, 0) for job in jobs) for field in LLM_STATS_FIELDS}
+        if stats["calls"]:
+            recent[model] = _usage_totals(stats)
+    return len(jobs), recent
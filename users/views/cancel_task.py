@@ -0,0 +1,36 @@
+from celery.result import AsyncResult
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from users.utilities import release_task_job, request_cancel
+
+
+@csrf_exempt
+def cancel_task(request, task_id):
+    """
+    Requests cancellation of a background Celery task.
+
+    - A task that is still queued is revoked so it never starts.
+    - The task's job key is released, so a new identical upload starts a fresh task.
+    - A running task is flagged and stops cooperatively before its next row,
+      freeing its worker slot without waiting for the remaining OpenAI calls.
+
+    Args:
+        request (HttpRequest): The incoming POST request.
+        task_id (str): The ID of the Celery task to cancel.
+
+    Returns:
+        JsonResponse: Status of the cancellation request.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid method"}, status=405)
+
+    result = AsyncResult(task_id)
+    if result.ready():
+        return JsonResponse({"status": "error", "message": "Task already finished"}, status=409)
+
+    request_cancel(task_id)
+    result.revoke()
+    release_task_job(task_id)
+
+    return JsonResponse({"status": "success", "task_id": task_id})
@@ -0,0 +1,135 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from users.models import User, UserConfiguration
+from users.utilities import enrich_company, save_llm_usage
+
+
+def _parse_records(body):
+    """
+    Parses a request body holding either a JSON array or NDJSON (one object per line).
+
+    Raises:
+        ValueError: If the body is not valid JSON or a record is not an object.
+    """
+    text = body.decode("utf-8").strip()
+    if not text:
+        return []
+    if text.startswith("["):
+        records = json.loads(text)
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if not all(isinstance(record, dict) for record in records):
+        raise ValueError("Each record must be a JSON object")
+    return records
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _result_line(index, name, pre_tier, enrichment=None):
+    enrichment = enrichment or {}
+    pre_tier = _int_or_none(pre_tier)
+    product_tier = _int_or_none(enrichment.get("Product Tier - CHAT GPT")) or 0
+    return json.dumps({
+        "Index": index,
+        "Company Name": name,
+        "Pre-Product Tier": pre_tier,
+        "Product Tier - CHAT GPT": product_tier,
+        "Post Tier": max(pre_tier or 0, product_tier),
+        "2 Word Description": enrichment.get("2 Word Description"),
+        "Product Tier Model": enrichment.get("Product Tier Model"),
+        "2 Word Description Model": enrichment.get("2 Word Description Model"),
+    }) + "\n"
+
+
+def _stream_results(df):
+    """
+    Yields one NDJSON line per company as soon as its tiers are known.
+
+    Rows excluded by the rule-based tiers (Tier 4) need no LLM call and are
+    yielded first; the rest are enriched concurrently and yielded in completion order.
+    """
+    needs_gpt = df["Pre-Product Tier"].ne(4).fillna(True).astype(bool)
+
+    for row in df.loc[~needs_gpt, ["Index", "Company Name", "Pre-Product Tier"]].itertuples(index=False):
+        yield _result_line(int(row[0]), row[1], row[2])
+
+    pending = df.loc[needs_gpt, ["Index", "Company Name", "Pre-Product Tier", "Description", "Website"]]
+    if pending.empty:
+        return
+
+    from users.llm_helpers import LLMUsage
+
+    usage = LLMUsage()
+    try:
+        with ThreadPoolExecutor(max_workers=settings.ENRICH_STREAM_WORKERS) as executor:
+            futures = {
+                executor.submit(enrich_company, row[3], row[4], usage): row[:3]
+                for row in pending.itertuples(index=False)
+            }
+            try:
+                for future in as_completed(futures):
+                    index, name, pre_tier = futures[future]
+                    yield _result_line(int(index), name, pre_tier, future.result())
+            finally:
+                # Client went away: drop the calls that have not started yet
+                for future in futures:
+                    future.cancel()
+    finally:
+        save_llm_usage(usage)
+
+
+@csrf_exempt
+def enrich_stream(request):
+    """
+    Tiers and enriches company records, streaming results back as NDJSON.
+
+    Expects a POST body with a JSON array or NDJSON of company records using the same
+    field names as the upload columns (e.g. "Company Name", "Website", "Description").
+    Applies the superuser's configuration exactly like `process_uploaded_file`.
+
+    Each response line is a JSON object with "Index", "Company Name", "Pre-Product Tier",
+    "Product Tier - CHAT GPT", "Post Tier", "2 Word Description", "Product Tier Model" and
+    "2 Word Description Model". Lines are written in completion order; "Index" numbers
+    the named input records from 1.
+
+    Returns:
+        StreamingHttpResponse: NDJSON results, or a JsonResponse describing the error.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid method"}, status=405)
+
+    user = User.objects.filter(is_superuser=True).first()
+    if not user:
+        return JsonResponse({"status": "error", "message": "User not found"}, status=404)
+
+    config = UserConfiguration.objects.filter(user=user).values_list("configuration_json", flat=True).first()
+    if not config:
+        return JsonResponse({"status": "error", "message": "Configuration not found"}, status=400)
+
+    try:
+        records = _parse_records(request.body)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    import pandas as pd
+    from users.tiering import INPUT_COLUMNS, apply_rule_tiers, prepare_companies
+
+    try:
+        df = prepare_companies(pd.DataFrame(records, columns=INPUT_COLUMNS))
+        apply_rule_tiers(df, config)
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    response = StreamingHttpResponse(_stream_results(df), content_type="application/x-ndjson")
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.http import JsonResponse
+
+from users.utilities import get_llm_usage_totals
+
+
+def llm_stats(request):
+    """
+    Returns running per-model LLM statistics across all jobs, for tuning the model cascade.
+
+    Returns:
+        JsonResponse: The configured cascade and, per model, call count, errors,
+                      average latency (ms), token counts and cost (USD).
+    """
+    cascade = [model for model in (settings.LLM_FAST_MODEL, settings.LLM_STRONG_MODEL) if model]
+    models = list(dict.fromkeys([*cascade, *settings.LLM_MODEL_COSTS]))
+    return JsonResponse({
+        "status": "success",
+        "cascade": cascade,
+        "models": get_llm_usage_totals(models),
+    })
@@ -1,8 +1,18 @@
+import base64
+
 from celery.result import AsyncResult
 from django.core.cache import cache
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
 
 from users.models import User
+from users.utilities import is_cancelled
+
+# Profile artifacts stored with a task's result: kind -> (download filename, content type)
+PROFILE_FILES = {
+    "pstats": ("profile.pstats", "application/octet-stream"),
+    "collapsed": ("profile.collapsed.txt", "text/plain"),
+}
 
 
 def task_status(request, task_id):
@@ -10,7 +20,9 @@ def task_status(request, task_id):
     Returns the current status and progress of a background Celery task.
 
     - If the task is completed successfully, returns status 'completed' along with progress (100%)
-      and the generated Excel file paths.
+      and the generated Excel file paths. Profiled tasks also return stage timings and
+      download URLs for their profile files.
+    - If the task was cancelled, returns status 'cancelled'.
     - If the task failed, returns status 'error'.
     - If the task is still running, returns status 'pending' and the current progress percentage
       from the cache.
@@ -31,13 +43,55 @@ def task_status(request, task_id):
     if result.ready():
         if result.successful():
             data = result.result
-            return JsonResponse({
+            if data.get("status") == "cancelled":
+                return JsonResponse({"status": "cancelled"})
+            response = {
                 "status": "completed",
                 "progress": 100,
                 "processed_excel": data.get("processed_excel"),
                 "action_excel": data.get("action_excel"),
-            })
+                "llm_stats": data.get("llm_stats"),
+            }
+            if data.get("profile"):
+                response["profile"] = {
+                    "engine": data["profile"]["engine"],
+                    "stages": data["profile"]["stages"],
+                    "downloads": {
+                        kind: reverse("task_profile", args=[task_id, kind]) for kind in PROFILE_FILES
+                    },
+                }
+            return JsonResponse(response)
         else:
+            if is_cancelled(task_id):
+                return JsonResponse({"status": "cancelled"})
             return JsonResponse({"status": "error", "message": "Task failed"}, status=500)
 
     return JsonResponse({"status": "pending", "progress": percent})
+
+
+def task_profile(request, task_id, kind):
+    """
+    Downloads a profile file produced by a task run with profiling enabled.
+
+    Args:
+        request (HttpRequest): The incoming HTTP request.
+        task_id (str): The ID of the Celery task.
+        kind (str): "pstats" (load with `pstats.Stats` or snakeviz) or "collapsed"
+                    (collapsed stacks for flamegraph.pl / speedscope).
+
+    Returns:
+        HttpResponse: The file as an attachment, or a JsonResponse error if not available.
+    """
+    if kind not in PROFILE_FILES:
+        return JsonResponse({"status": "error", "message": "Unknown profile file"}, status=404)
+
+    result = AsyncResult(task_id)
+    data = result.result if result.ready() and result.successful() else None
+    profile = data.get("profile") if isinstance(data, dict) else None
+    if not profile:
+        return JsonResponse({"status": "error", "message": "No profile for this task"}, status=404)
+
+    filename, content_type = PROFILE_FILES[kind]
+    response = HttpResponse(base64.b64decode(profile[kind]), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{task_id}-{filename}"'
+    return response
@@ -1,14 +1,29 @@
 import base64
+import time
+import uuid
 
+from celery.result import AsyncResult
 from django.http import JsonResponse
 from django.shortcuts import render
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
-from users.models import User
+from users.models import User, UserConfiguration
 from users.tasks import process_uploaded_file
-from users.utilities import save_progress
+from users.utilities import claim_job, get_job_key, get_job_task_id, is_job_alive, replace_job, save_progress
+
+
+def _in_flight(result):
+    """
+    Returns True if a task is still queued, or running on a live worker.
+
+    With `CELERY_TASK_TRACK_STARTED` a running task reports STARTED; a STARTED task whose
+    heartbeat has expired was lost with its worker. PENDING means still queued.
+    """
+    if result.state == "PENDING":
+        return True
+    return result.state in ("STARTED", "RETRY") and is_job_alive(result.id)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -18,7 +33,8 @@ class UploadAndTierView(View):
     generates descriptions and product tiers using GPT, and returns two CSV outputs.
 
     - GET: Renders the upload form.
-    - POST: Processes the uploaded file and applies tier logic + LLM-based enhancements.
+    - POST: Processes the uploaded file and applies tier logic + LLM-based enhancements,
+      or, with "dry_run" set, only estimates the LLM workload of processing it.
     """
 
     def get(self, request):
@@ -35,8 +51,15 @@ class UploadAndTierView(View):
         Handles file upload and initiates background processing using Celery.
 
         - Validates the presence of a superuser and uploaded file.
-        - Reads the uploaded file, encodes it to base64, and sends it to a Celery task.
+        - Reads the uploaded file (and optional Excel sheet name), encodes it to base64,
+          and sends it to a Celery task.
+        - Reuses the existing task if the same file was already submitted with the same
+          configuration: an in-flight task is joined, a finished one returns its files at once.
+          A queued task is joined however long it waits; a started one only while its heartbeat
+          is fresh (see `JobHeartbeat`), so a task lost with its worker is replaced.
+          Jobs submitted with "profile" set always run, so a fresh profile is produced.
         - Stores initial progress in the cache and returns the task ID for tracking.
+        - With "dry_run" set, nothing is queued: see `dry_run()`.
 
         Args:
             request (HttpRequest): The incoming POST request containing the file.
@@ -53,10 +76,79 @@ class UploadAndTierView(View):
             return JsonResponse({"status": "error", "message": "No file uploaded"}, status=400)
 
         filename = file.name.lower()
-        file_data_b64 = base64.b64encode(file.read()).decode()
+        sheet_name = request.POST.get("sheet_name", "").strip() or None
+        profile = request.POST.get("profile") in ("1", "true", "on")
+        file_data = file.read()
+        config = UserConfiguration.objects.filter(user=user).values_list("configuration_json", flat=True).first()
+        if request.POST.get("dry_run") in ("1", "true", "on"):
+            return self.dry_run(file_data, filename, config, sheet_name)
+
+        job_key = get_job_key(file_data, config, sheet_name)
+
+        # Join an identical job if one is running or has finished successfully
+        task_id = str(uuid.uuid4())
+        if profile:
+            replace_job(job_key, task_id)
+        elif not claim_job(job_key, task_id):
+            existing_id = get_job_task_id(job_key)
+            existing = AsyncResult(existing_id) if existing_id else None
+            if existing is not None and _in_flight(existing):
+                return JsonResponse({"status": "success", "task_id": existing_id, "reused": True}, status=200)
+            if existing is not None and existing.successful() and existing.result.get("status") == "success":
+                data = existing.result
+                return JsonResponse({
+                    "status": "completed",
+                    "task_id": existing_id,
+                    "reused": True,
+                    "processed_excel": data.get("processed_excel"),
+                    "action_excel": data.get("action_excel"),
+                }, status=200)
+            replace_job(job_key, task_id)
 
         # Start Celery task
         save_progress(user.id, 0, 1)
-        task = process_uploaded_file.delay(file_data_b64, filename, user.id)
+        file_data_b64 = base64.b64encode(file_data).decode()
+        task = process_uploaded_file.apply_async(
+            args=(file_data_b64, filename, user.id),
+            kwargs={"job_key": job_key, "sheet_name": sheet_name, "profile": profile},
+            task_id=task_id,
+        )
 
         return JsonResponse({"status": "success", "task_id": task.id}, status=200)
+
+    def dry_run(self, file_data, filename, config, sheet_name=None):
+        """
+        Runs ingestion and the rule-based tiers in the web process and estimates the LLM workload.
+
+        Args:
+            file_data (bytes): Raw content of the uploaded file.
+            filename (str): Lower-cased name of the uploaded file.
+            config (dict): The superuser's configuration JSON.
+            sheet_name (str, optional): Excel sheet to read.
+
+        Returns:
+            JsonResponse: "rows", the "Pre-Product Tier" distribution, the enrichment work left
+            after dedup and cache hits (see `count_enrichment_work()`), the "estimate" from
+            measured LLM throughput (None before any job has run) and "elapsed_ms".
+        """
+        if not config:
+            return JsonResponse({"status": "error", "message": "Configuration not found"}, status=400)
+
+        from users.estimates import count_enrichment_work, estimate_llm_workload, tier_distribution
+        from users.readers import read_tiered_companies
+
+        start = time.perf_counter()
+        try:
+            df = read_tiered_companies(file_data, filename, config, sheet_name=sheet_name)
+        except Exception as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+        work = count_enrichment_work(df)
+        return JsonResponse({
+            "status": "dry_run",
+            "rows": len(df),
+            "tiers": tier_distribution(df),
+            **work,
+            "estimate": estimate_llm_workload(work["rows_to_enrich"]),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        }, status=200)